@@ -0,0 +1,86 @@
+"""
+Модуль содержит версии моделей для инвалидации кэша.
+Версия модели увеличивается после фиксации каждой записи в неё
+(см. signals.py), поэтому ключи кэша, включающие версию, устаревают сами.
+Версии хранятся в том же кэше, что и данные. Кэш по умолчанию
+(LocMemCache) свой в каждом процессе, поэтому инвалидация работает
+между процессами только с общим кэшем (настройка CACHES).
+"""
+import time
+from hashlib import md5
+
+from django.core.cache import cache
+
+VERSION_KEY = 'model-version:{}'
+STATS_KEY = 'response-cache:{}'
+
+
+def _version_key(model):
+    return VERSION_KEY.format(model._meta.label_lower)
+
+
+def _initial_version():
+    """
+    Начальное значение версии.
+    Берётся от времени, чтобы после вытеснения ключа из кэша
+    версия не повторила уже использованное значение.
+    """
+    return time.time_ns()
+
+
+def get_model_versions(models):
+    """Возвращает кортеж текущих версий переданных моделей."""
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_model_version(model):
+    """Увеличивает версию модели."""
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), None)
+
+
+def make_cache_key(prefix, models, request, ignored_params=()):
+    """
+    Возвращает ключ кэша по версиям моделей, пути и параметрам запроса.
+    Параметры сортируются, поэтому их порядок в строке запроса не важен.
+    В ключ входит версия API запроса: разные форматы ответа
+    кэшируются раздельно.
+    """
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        if key not in ignored_params
+        for value in values
+    )
+    raw = repr((get_model_versions(models), request.path, params,
+                getattr(request, 'version', None)))
+    return f'{prefix}:' + md5(raw.encode('utf-8')).hexdigest()
+
+
+def record_response_cache(hit):
+    """Увеличивает счётчик попаданий или промахов кэша ответов."""
+    key = STATS_KEY.format('hits' if hit else 'misses')
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_response_cache_stats():
+    """Возвращает счётчики попаданий и промахов кэша ответов."""
+    stats = cache.get_many([STATS_KEY.format('hits'),
+                            STATS_KEY.format('misses')])
+    return {
+        'hits': stats.get(STATS_KEY.format('hits'), 0),
+        'misses': stats.get(STATS_KEY.format('misses'), 0),
+    }
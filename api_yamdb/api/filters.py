@@ -1,19 +1,101 @@
 """Модуль содержит самописные фильтры."""
 import django_filters as filters
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
 
-from reviews.models import Title
+from reviews.models import GenreTitle, Title
+from reviews.search import search_titles
+
+
+def parse_ids(value):
+    """
+    Возвращает список id из строки вида '1,2,3' без повторов,
+    в порядке первого появления.
+    Число id ограничено настройкой TITLE_IDS_LIMIT.
+    """
+    try:
+        ids = list(dict.fromkeys(
+            int(item) for item in value.split(',') if item
+        ))
+    except ValueError:
+        raise ValidationError({'ids': 'Укажите id через запятую.'})
+    if len(ids) > settings.TITLE_IDS_LIMIT:
+        raise ValidationError({
+            'ids': f'Можно запросить не более {settings.TITLE_IDS_LIMIT} id.'
+        })
+    return ids
 
 
 class TitleFilter(filters.FilterSet):
     """
     Фильтр для произведений, спроектирован по требованиям тестов.
     Имя произведения фильтруется по частичному совпадению.
+    Параметр search выполняет полнотекстовый поиск по названию
+    и описанию с сортировкой по релевантности.
+    Параметр genre принимает несколько slug через запятую.
+    При genre_mode=any (по умолчанию) подходят произведения хотя бы
+    с одним из жанров, при genre_mode=all - со всеми жанрами.
+    Жанры проверяются некоррелированными подзапросами `id IN (...)`
+    по таблице связей, поэтому число жанров не увеличивает число строк
+    и не требует DISTINCT.
+    Параметр ids принимает id произведений через запятую
+    (не более TITLE_IDS_LIMIT).
+    Хранимые поля рейтинга и служебные флаги произведения не входят
+    в фильтры: Meta.fields перечисляет поля явно.
+    Параметр ordering задаёт сортировку по одному из полей ORDERING_FIELDS
+    (с '-' - по убыванию). Для каждого поля есть индекс, а дополнительная
+    сортировка по id в том же направлении обслуживается тем же индексом.
+    В режиме курсора сортировку задаёт пагинация.
     """
-    genre = filters.CharFilter(field_name='genre__slug')
+    ORDERING_FIELDS = {
+        'rating': 'rating',
+        'year': 'year',
+        'review_count': 'score_count',
+        'name': 'name',
+    }
+    GENRE_MODES = (('any', 'any'), ('all', 'all'))
+
+    ids = filters.CharFilter(method='filter_ids')
+    genre = filters.CharFilter(method='filter_genre')
+    genre_mode = filters.ChoiceFilter(choices=GENRE_MODES,
+                                      method='filter_genre_mode')
     category = filters.CharFilter(field_name='category__slug')
     year = filters.NumberFilter(field_name='year')
     name = filters.CharFilter(field_name='name', lookup_expr='contains')
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=[(f'{prefix}{name}', f'{prefix}{name}')
+                 for name in ORDERING_FIELDS for prefix in ('', '-')],
+        method='filter_ordering'
+    )
 
     class Meta:
         model = Title
-        fields = '__all__'
+        fields = ('id', 'name', 'year', 'description', 'category', 'genre')
+
+    def filter_ids(self, queryset, name, value):
+        return queryset.filter(pk__in=parse_ids(value))
+
+    def filter_genre(self, queryset, name, value):
+        slugs = sorted({slug for slug in value.split(',') if slug})
+        if self.form.cleaned_data.get('genre_mode') == 'all':
+            groups = [[slug] for slug in slugs]
+        else:
+            groups = [slugs]
+        for group in groups:
+            queryset = queryset.filter(pk__in=GenreTitle.objects.filter(
+                genre__slug__in=group
+            ).values('title'))
+        return queryset
+
+    def filter_genre_mode(self, queryset, name, value):
+        """Режим применяется в filter_genre."""
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_titles(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        prefix = '-' if value.startswith('-') else ''
+        field = self.ORDERING_FIELDS[value.lstrip('-')]
+        return queryset.order_by(f'{prefix}{field}', f'{prefix}id')
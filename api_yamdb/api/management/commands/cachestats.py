@@ -0,0 +1,17 @@
+"""Модуль содержит команду вывода статистики кэша ответов."""
+from django.core.management.base import BaseCommand
+
+from api.cache import get_response_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Статистика попаданий в кэш ответов api'
+
+    def handle(self, *args, **options):
+        stats = get_response_cache_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total if total else 0
+        self.stdout.write(
+            f'Попаданий: {stats["hits"]}, промахов: {stats["misses"]}, '
+            f'доля попаданий: {ratio:.1%}'
+        )
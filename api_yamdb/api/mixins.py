@@ -1,8 +1,46 @@
 """Модуль содержит самописные миксины."""
-from rest_framework import generics, mixins, viewsets
+from calendar import timegm
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Max
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import generics, mixins, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 
+from reviews.models import Title
+from .cache import make_cache_key, record_response_cache
 from .permissions import AdminOrReadonly
+from .serializers import ReadTitleValuesSerializer
+
+
+def get_limit_param(request, default, maximum):
+    """Возвращает параметр limit запроса в пределах от 1 до maximum."""
+    try:
+        limit = int(request.query_params['limit'])
+    except (KeyError, ValueError):
+        return default
+    return min(max(limit, 1), maximum)
+
+
+def serialize_titles(title_ids):
+    """
+    Сериализует произведения по списку id в порядке списка
+    двумя запросами: произведения с категориями и жанры.
+    """
+    rows = ReadTitleValuesSerializer.prepare_queryset(
+        Title.objects.filter(pk__in=title_ids).order_by()
+    )
+    rows_by_id = {row['id']: row for row in rows}
+    return ReadTitleValuesSerializer(
+        [rows_by_id[pk] for pk in title_ids if pk in rows_by_id],
+        many=True
+    ).data
 
 
 class CreateByAdminOrReadOnlyModelMixin(mixins.CreateModelMixin,
@@ -34,3 +72,218 @@ class CreateOrChangeByAdminOrReadOnlyModelMixin(mixins.CreateModelMixin,
 class PostByAny(mixins.CreateModelMixin, generics.GenericAPIView):
     """Миксин для классов: метод POST, разрешён всем."""
     permission_classes = (AllowAny, )
+
+
+class BulkCreateMixin:
+    """
+    Миксин для классов: POST со списком объектов создаёт их пакетом
+    (см. BulkListSerializer). В ответе - число созданных объектов.
+    bulk_created вызывается с созданными объектами после фиксации.
+    """
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(
+            data=request.data, many=True, allow_empty=False
+        )
+        serializer.is_valid(raise_exception=True)
+        created = serializer.save()
+        self.bulk_created(created)
+        return Response({'created': len(created)},
+                        status=status.HTTP_201_CREATED)
+
+    def bulk_created(self, objects):
+        pass
+
+
+class CachedResponseMixin:
+    """
+    Миксин для вьюсетов: кэширование ответов на чтение.
+    Ключ строится по пути, параметрам запроса и версиям моделей
+    из атрибута response_cache_models, поэтому запись в любую из них
+    делает закэшированные ответы неактуальными.
+    В заголовке X-Cache возвращается HIT или MISS.
+    """
+    response_cache_models = ()
+    response_cache_timeout = 60 * 60
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = make_cache_key(
+            'response', self.response_cache_models, request
+        )
+        data = cache.get(key)
+        record_response_cache(hit=data is not None)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, self.response_cache_timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class CachedListMixin(CachedResponseMixin):
+    """Миксин для вьюсетов: кэширование ответов на GET списка."""
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedListRetrieveMixin(CachedListMixin):
+    """Миксин для вьюсетов: кэширование ответов на GET списка и объекта."""
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class ConditionalReadMixin:
+    """
+    Миксин для вьюсетов: условные GET запросы списка и объекта.
+    ETag строится по версиям моделей из атрибута etag_models, пути
+    и параметрам запроса, без запросов к БД и без сериализации.
+    Last-Modified - максимальное значение поля last_modified_field
+    среди отдаваемых записей. Это дата публикации, поэтому правки
+    существующих записей отслеживаются только через ETag.
+    При совпадении возвращается 304 Not Modified.
+    """
+    etag_models = ()
+    last_modified_field = None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_etag(self, request):
+        return quote_etag(make_cache_key('etag', self.etag_models, request))
+
+    def get_last_modified(self):
+        if self.last_modified_field is None:
+            return None
+        queryset = self.get_queryset()
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        last_modified = queryset.aggregate(
+            last_modified=Max(self.last_modified_field)
+        )['last_modified']
+        if last_modified is None:
+            return None
+        return timegm(last_modified.utctimetuple())
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        last_modified = self.get_last_modified()
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class SparseQuerysetMixin:
+    """
+    Миксин для вьюсетов: параметр fields ограничивает запрос к БД.
+    Отфильтрованный queryset передаётся в sparse_queryset сериализатора
+    (см. SparseFieldsMixin), если сериализатор его поддерживает.
+    В режиме курсора в запрос добавляются поля cursor_ordering.
+    """
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if not hasattr(serializer_class, 'sparse_queryset'):
+            return queryset
+        return serializer_class.sparse_queryset(
+            queryset, self.request, self.get_sparse_required_fields()
+        )
+
+    def get_sparse_required_fields(self):
+        if 'cursor' not in self.request.query_params:
+            return ()
+        return tuple(field.lstrip('-')
+                     for field in getattr(self, 'cursor_ordering', ()))
+
+
+class NestedParentMixin:
+    """
+    Миксин для вложенных вьюсетов: отзывы произведения и комментарии
+    отзыва. Родительский объект маршрута загружается не больше одного
+    раза за запрос: get_parent() сохраняет его на экземпляре вью,
+    сериализаторы и пермишены получают его через view.get_parent().
+    check_parent_exists() проверяет существование родителя запросом
+    exists() без выборки столбцов - для списков, где сам объект
+    не нужен. parent_lookups сопоставляет поля родительской модели
+    с именованными параметрами маршрута.
+    """
+    parent_model = None
+    parent_lookups = {}
+
+    def get_parent_queryset(self):
+        return self.parent_model.objects.filter(**{
+            field: self.kwargs[kwarg]
+            for field, kwarg in self.parent_lookups.items()
+        })
+
+    def get_parent(self):
+        if getattr(self, '_parent', None) is None:
+            self._parent = get_object_or_404(self.get_parent_queryset())
+        return self._parent
+
+    def check_parent_exists(self):
+        if getattr(self, '_parent', None) is not None:
+            return
+        if not getattr(self, '_parent_exists', False):
+            if not self.get_parent_queryset().exists():
+                raise Http404
+            self._parent_exists = True
+
+
+class TopTitlesMixin:
+    """
+    Миксин для вьюсетов жанров и категорий: GET {slug}/top/.
+    Возвращает limit произведений с наибольшим рейтингом.
+    id произведений выбираются по составному индексу
+    из get_top_title_ids, поэтому стоимость запроса зависит от limit,
+    а не от количества произведений.
+    По умолчанию произведения отбираются по полю top_title_field
+    модели Title, ссылающемуся на объект: для него нужен индекс
+    (top_title_field, rating, id).
+    """
+    top_title_field = None
+    top_default_limit = 10
+    top_max_limit = 100
+
+    def get_top_title_ids(self, obj, limit):
+        if self.top_title_field is None:
+            raise ImproperlyConfigured(
+                f'{type(self).__name__}: укажите top_title_field '
+                'или переопределите get_top_title_ids()'
+            )
+        return Title.objects.filter(
+            **{self.top_title_field: obj}, rating__isnull=False
+        ).order_by('-rating', '-id').values_list('id', flat=True)[:limit]
+
+    def get_top_limit(self, request):
+        return get_limit_param(
+            request, self.top_default_limit, self.top_max_limit
+        )
+
+    @action(detail=True, methods=['get'])
+    def top(self, request, *args, **kwargs):
+        title_ids = list(self.get_top_title_ids(
+            self.get_object(), self.get_top_limit(request)
+        ))
+        return Response(serialize_titles(title_ids))
@@ -0,0 +1,197 @@
+"""Модуль содержит самописные классы пагинации."""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import make_cache_key
+
+
+def _resolve_field(model, path):
+    """Возвращает поле модели по пути вида `category__name`."""
+    *relations, name = path.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    if name == 'pk':
+        return model._meta.pk
+    return model._meta.get_field(name)
+
+
+def _get_value(instance, path):
+    """
+    Возвращает значение по пути вида `category__name` у объекта
+    или у словаря из QuerySet.values().
+    """
+    if isinstance(instance, dict):
+        return instance[path]
+    for attr in path.split('__'):
+        instance = getattr(instance, attr)
+    return instance
+
+
+def _keyset_filter(ordering, values):
+    """
+    Строит условие "строго после курсора" для сортировки ordering:
+    (a > x) OR (a = x AND b > y) OR ...
+    Для полей с '-' сравнение меняется на "меньше".
+    """
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+class CachedCountPagination(LimitOffsetPagination):
+    """
+    Пагинация limit/offset с кэшируемым или отключаемым подсчётом записей.
+    С параметром count=false подсчёт не выполняется: в ответе count равен
+    None, а наличие следующей страницы определяется по лишней записи.
+    Иначе количество берётся из кэша по пути и параметрам фильтрации.
+    Ключ включает версии моделей из атрибута вьюсета cache_models
+    (по умолчанию - модель набора запросов), поэтому любая запись
+    в эти модели делает закэшированное количество неактуальным.
+    Версии увеличиваются после фиксации транзакции записи (см. cache.py).
+    Кэш по умолчанию (LocMemCache) и версии в нём свои в каждом
+    процессе: при нескольких процессах сервера запись в одном из них
+    не сбрасывает количество, закэшированное другими, до истечения
+    count_cache_timeout. Для нескольких процессов нужен общий кэш.
+    """
+    count_query_param = 'count'
+    count_cache_timeout = 60 * 60 * 24
+    pagination_query_params = ('limit', 'offset', 'count', 'cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.offset = self.get_offset(request)
+        self.request = request
+        if self.skip_count(request):
+            self.count = None
+            results = list(queryset[self.offset:self.offset + self.limit + 1])
+            self.has_next = len(results) > self.limit
+            return results[:self.limit]
+
+        self.count = self.get_cached_count(queryset, request, view)
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return list(queryset[self.offset:self.offset + self.limit])
+
+    def skip_count(self, request):
+        value = request.query_params.get(self.count_query_param, '')
+        return value.lower() in ('false', '0')
+
+    def get_count_cache_key(self, queryset, request, view):
+        models = getattr(view, 'cache_models', None) or (queryset.model,)
+        return make_cache_key(
+            'count', models, request, self.pagination_query_params
+        )
+
+    def get_cached_count(self, queryset, request, view):
+        key = self.get_count_cache_key(queryset, request, view)
+        count = cache.get(key)
+        if count is None:
+            count = self.get_count(queryset)
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def get_next_link(self):
+        if self.count is None and not self.has_next:
+            return None
+        if self.count is None:
+            url = self.request.build_absolute_uri()
+            url = replace_query_param(url, self.limit_query_param, self.limit)
+            return replace_query_param(
+                url, self.offset_query_param, self.offset + self.limit
+            )
+        return super().get_next_link()
+
+
+class KeysetOrLimitOffsetPagination(CachedCountPagination):
+    """
+    Пагинация limit/offset с опциональным режимом курсора (keyset).
+    По умолчанию работает как CachedCountPagination.
+    Если в запросе передан параметр cursor (пустой для первой страницы),
+    страницы выбираются по значениям полей сортировки последней записи,
+    без OFFSET и без COUNT(*).
+    Сортировка берётся из атрибута вьюсета cursor_ordering и должна
+    заканчиваться уникальным полем, например pk.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.cursor_query_param in request.query_params
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.ordering = view.cursor_ordering
+        queryset = queryset.order_by(*self.ordering)
+        values = self.decode_cursor(request, queryset.model)
+        if values is not None:
+            queryset = queryset.filter(
+                _keyset_filter(self.ordering, values)
+            )
+        results = list(queryset[:self.limit + 1])
+        self.has_next = len(results) > self.limit
+        self.page = results[:self.limit]
+        return self.page
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_cursor_link(),
+            'results': data,
+        })
+
+    def get_next_cursor_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def encode_cursor(self, instance):
+        values = []
+        for field in self.ordering:
+            value = _get_value(instance, field.lstrip('-'))
+            if isinstance(value, date):
+                value = value.isoformat()
+            values.append(value)
+        return urlsafe_b64encode(
+            json.dumps(values).encode('utf-8')
+        ).decode('ascii')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params[self.cursor_query_param]
+        if not encoded:
+            return None
+        try:
+            values = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                _resolve_field(model, field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
@@ -1,9 +1,88 @@
 """Модуль содержит сериализаторы, используемые в REST API."""
+from collections import Counter, OrderedDict, defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.utils.timezone import datetime
 from rest_framework import serializers, validators
 from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+
+from reviews.models import (SCORES, Category, Comment, Genre, GenreTitle,
+                            Review, Title, User, histogram_field)
+from .cache import bump_model_version
+
+# Размер одного INSERT при пакетном создании: SQLite ограничивает
+# число слагаемых составного SELECT, которым Django вставляет строки.
+BULK_BATCH_SIZE = 500
+
+
+class SparseFieldsMixin:
+    """
+    Миксин для сериализаторов: параметр запроса fields со списком полей
+    через запятую ограничивает поля ответа на GET.
+    Неизвестные имена игнорируются, без известных возвращаются все поля.
+    sparse_queryset ограничивает и запрос к БД: откладывает ненужные
+    столбцы, а связи из field_sources подключает только для запрошенных
+    полей. field_sources сопоставляет поле ответа с путями полей модели,
+    по умолчанию поле ответа совпадает с полем модели.
+    """
+    fields_query_param = 'fields'
+    field_sources = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.get_requested_fields(self.context.get('request'))
+        if requested is not None:
+            for name in set(self.fields) - set(requested):
+                self.fields.pop(name)
+
+    @classmethod
+    def get_requested_fields(cls, request):
+        """Возвращает запрошенные поля в порядке Meta.fields или None."""
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        value = request.query_params.get(cls.fields_query_param, '')
+        names = set(value.split(','))
+        requested = tuple(name for name in cls.Meta.fields if name in names)
+        return requested or None
+
+    @classmethod
+    def get_source_paths(cls, requested):
+        paths = []
+        for name in requested:
+            paths.extend(cls.field_sources.get(name, (name, )))
+        return paths
 
-from reviews.models import Category, Comment, Genre, Review, Title, User
+    @classmethod
+    def sparse_queryset(cls, queryset, request, required=()):
+        """
+        Ограничивает queryset полями, запрошенными в request.
+        required - пути полей модели, нужные помимо запрошенных,
+        например значения курсора пагинации.
+        """
+        requested = cls.get_requested_fields(request)
+        if requested is None:
+            return queryset
+        opts = queryset.model._meta
+        columns, related, prefetch = {'pk'}, set(), set()
+        for path in cls.get_source_paths(requested) + list(required):
+            name, _, rest = path.partition('__')
+            if name != 'pk' and opts.get_field(name).many_to_many:
+                prefetch.add(name)
+                continue
+            columns.add(path)
+            if rest:
+                columns.add(name)
+                related.add(name)
+        queryset = queryset.select_related(None).prefetch_related(None)
+        queryset = queryset.only(*columns)
+        if related:
+            queryset = queryset.select_related(*related)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -57,20 +136,127 @@ class TitleSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'year', 'description', 'category', 'genre')
 
 
-class ReadTitleSerializer(serializers.ModelSerializer):
+class ReadTitleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Title.
     Применяется для метода GET.
+    Рейтинг и количество отзывов берутся из хранимых полей модели:
+    у каждого отзыва есть оценка, поэтому количество отзывов
+    совпадает с количеством оценок score_count.
+    Поддерживает параметр fields (см. SparseFieldsMixin).
     """
+    field_sources = {
+        'category': ('category__name', 'category__slug'),
+        'review_count': ('score_count', ),
+        'histogram': tuple(histogram_field(score) for score in SCORES),
+    }
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(many=True, read_only=True)
     rating = serializers.IntegerField(read_only=True)
+    review_count = serializers.IntegerField(source='score_count',
+                                            read_only=True)
     year = serializers.IntegerField(read_only=True)
     name = serializers.CharField(read_only=True)
 
     class Meta:
         model = Title
-        fields = '__all__'
+        fields = ('id', 'category', 'genre', 'rating', 'review_count',
+                  'year', 'name', 'description')
+
+
+class ReadTitleHistogramSerializer(ReadTitleSerializer):
+    """
+    Сериализатор для модели Title с гистограммой оценок.
+    Применяется для метода GET объекта с параметром histogram=true.
+    """
+    histogram = serializers.DictField(child=serializers.IntegerField(),
+                                      read_only=True)
+
+    class Meta(ReadTitleSerializer.Meta):
+        fields = ReadTitleSerializer.Meta.fields + ('histogram', )
+
+
+class ReadTitleValuesListSerializer(serializers.ListSerializer):
+    """
+    Списочный сериализатор для ReadTitleValuesSerializer.
+    Жанры всех произведений страницы загружаются одним запросом.
+    """
+    def to_representation(self, data):
+        rows = list(data)
+        genres = defaultdict(list)
+        links = GenreTitle.objects.filter(
+            title_id__in=[row['id'] for row in rows]
+        ).order_by('genre__name').values_list(
+            'title_id', 'genre__name', 'genre__slug'
+        )
+        if 'genre' not in self.child.requested_fields:
+            return [self.child.to_representation(row) for row in rows]
+        for title_id, name, slug in links:
+            genres[title_id].append(
+                OrderedDict((('name', name), ('slug', slug)))
+            )
+        for row in rows:
+            row['genre'] = genres[row['id']]
+        return [self.child.to_representation(row) for row in rows]
+
+
+class ReadTitleValuesSerializer(serializers.BaseSerializer):
+    """
+    Сериализатор только для чтения списка произведений.
+    Строит тот же ответ, что и ReadTitleSerializer, из словарей
+    QuerySet.values() без механизма полей DRF.
+    Применяется только с many=True: жанры добавляет
+    ReadTitleValuesListSerializer.
+    Параметр fields обрабатывается как в ReadTitleSerializer:
+    ненужные столбцы и связи не попадают в запрос.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requested_fields = self.get_requested_fields(
+            self.context.get('request')
+        )
+
+    @staticmethod
+    def get_requested_fields(request):
+        return (ReadTitleSerializer.get_requested_fields(request)
+                or ReadTitleSerializer.Meta.fields)
+
+    @classmethod
+    def prepare_queryset(cls, queryset, request=None, required=()):
+        """
+        Переводит queryset на словари values() с полями,
+        запрошенными в request. required - дополнительные пути полей.
+        """
+        paths = ReadTitleSerializer.get_source_paths(
+            cls.get_requested_fields(request)
+        )
+        values_fields = ['id'] + [
+            path for path in paths + list(required)
+            if path not in ('id', 'genre')
+        ]
+        return queryset.prefetch_related(None).values(
+            *OrderedDict.fromkeys(values_fields)
+        )
+
+    def to_representation(self, row):
+        representation = OrderedDict()
+        for name in self.requested_fields:
+            if name == 'category':
+                value = OrderedDict((
+                    ('name', row['category__name']),
+                    ('slug', row['category__slug']),
+                ))
+            elif name == 'rating':
+                value = None if row['rating'] is None else int(row['rating'])
+            elif name == 'review_count':
+                value = row['score_count']
+            else:
+                value = row[name]
+            representation[name] = value
+        return representation
+
+    class Meta:
+        list_serializer_class = ReadTitleValuesListSerializer
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -201,35 +387,54 @@ class ConfirmationSerializer(serializers.ModelSerializer):
         fields = ('username', 'confirmation_code')
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Review.
-    Выполняется контроль правила 'от каждого пользователя возможен только
-    один отзыв на каждое произведение'.
+    Правило 'от каждого пользователя возможен только один отзыв
+    на каждое произведение' проверяет ограничение unique_riview в БД:
+    отзыв создаётся одним INSERT без предварительной проверки,
+    нарушение ограничения превращается в ошибку валидации.
+    Поддерживает параметр fields (см. SparseFieldsMixin).
     """
+    default_error_messages = {
+        'duplicate': 'Извините, возможен только один отзыв',
+    }
+    field_sources = {'author': ('author__username', )}
     author = serializers.SlugRelatedField(slug_field='username',
                                           read_only=True)
 
-    def validate(self, attrs):
-        request = self.context['request']
-        author = request.user
-        title_id = self.context['view'].kwargs.get('title_id')
-        title = get_object_or_404(Title, pk=title_id)
-        if request.method == 'POST':
-            if Review.objects.filter(title=title, author=author).exists():
-                raise serializers.ValidationError(
-                    'Извините, возможен только один отзыв'
-                )
-        return attrs
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            if not Review.objects.filter(
+                title=validated_data['title'],
+                author=validated_data['author']
+            ).exists():
+                raise
+        raise serializers.ValidationError({
+            api_settings.NON_FIELD_ERRORS_KEY: [
+                self.error_messages['duplicate']
+            ]
+        }, code='duplicate')
 
     class Meta:
-        fields = ('id', 'text', 'pub_date', 'author', 'score', 'title')
-        read_only_fields = ('id', 'title')
+        fields = ('id', 'text', 'pub_date', 'author', 'score', 'title',
+                  'comment_count')
+        read_only_fields = ('id', 'title', 'comment_count')
         model = Review
 
 
-class CommentSerializer(serializers.ModelSerializer):
-    """Сериализатор для модели Comment."""
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Сериализатор для модели Comment.
+    Поддерживает параметр fields (см. SparseFieldsMixin).
+    """
+    field_sources = {
+        'author': ('author__username', ),
+        'review': ('review__text', ),
+    }
     author = serializers.SlugRelatedField(
         slug_field='username',
         read_only=True
@@ -243,3 +448,215 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'pub_date', 'review')
         read_only_fields = ('review', 'id',)
         model = Comment
+
+
+class CommentCompactSerializer(CommentSerializer):
+    """
+    Компактный формат комментария (версия 2 API комментариев):
+    вместо текста отзыва возвращается его id. Значение берётся
+    из столбца review_id, отзыв не загружается.
+    """
+    field_sources = {'author': ('author__username', )}
+    review = serializers.PrimaryKeyRelatedField(read_only=True)
+
+
+def add_error(errors, field, message):
+    """Добавляет сообщение к ошибкам поля элемента пакета."""
+    errors.setdefault(field, []).append(message)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    Списочный сериализатор пакетного создания.
+    Пакет проверяется целиком: связанные объекты загружаются одним
+    запросом на модель, а не запросом на элемент. Проверки пакета
+    выполняются и при ошибках в полях других элементов. Ошибки
+    возвращаются списком той же длины, что и пакет, с пустым словарём
+    у корректных элементов. При любой ошибке не создаётся ни один объект.
+    Автор элемента - пользователь запроса; администратор может указать
+    другого автора по username в поле author.
+    Объекты создаются через bulk_create, сигналы моделей
+    не отправляются, поэтому create сам обновляет зависимые данные.
+    """
+    default_error_messages = {
+        'max_length': 'В пакете должно быть не больше {limit} элементов.',
+        'author_forbidden': 'Указывать автора может только администратор.',
+        'author_not_found': 'Пользователь не найден.',
+    }
+
+    def to_internal_value(self, data):
+        limit = settings.BULK_CREATE_LIMIT
+        if not isinstance(data, list):
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    self.error_messages['not_a_list'].format(
+                        input_type=type(data).__name__
+                    )
+                ]
+            }, code='not_a_list')
+        if not data and not self.allow_empty:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    self.error_messages['empty']
+                ]
+            }, code='empty')
+        if len(data) > limit:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    self.error_messages['max_length'].format(limit=limit)
+                ]
+            }, code='max_length')
+        items, errors = [], []
+        for item in data:
+            try:
+                items.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                items.append(None)
+                errors.append(exc.detail)
+        # проверки пакета выполняются для элементов, прошедших проверку
+        # полей; словари ошибок общие, поэтому ошибки попадают в errors
+        valid = [(item, item_errors)
+                 for item, item_errors in zip(items, errors)
+                 if item is not None]
+        if valid:
+            valid_items, valid_errors = map(list, zip(*valid))
+            self.resolve_authors(valid_items, valid_errors)
+            self.validate_batch(valid_items, valid_errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    def resolve_authors(self, items, errors):
+        """Заменяет username авторов пользователями одним запросом."""
+        user = self.context['request'].user
+        usernames = {item['author'] for item in items if 'author' in item}
+        if usernames and not user.is_admin:
+            for item, item_errors in zip(items, errors):
+                if 'author' in item:
+                    add_error(item_errors, 'author',
+                              self.error_messages['author_forbidden'])
+            return
+        authors = User.objects.in_bulk(usernames, field_name='username')
+        for item, item_errors in zip(items, errors):
+            username = item.get('author')
+            if username is None:
+                item['author'] = user
+            elif username in authors:
+                item['author'] = authors[username]
+            else:
+                add_error(item_errors, 'author',
+                          self.error_messages['author_not_found'])
+
+    def validate_batch(self, items, errors):
+        """Проверки, требующие запросов к БД, для всего пакета."""
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        try:
+            with transaction.atomic():
+                objects = model.objects.bulk_create(
+                    (model(**item) for item in validated_data),
+                    batch_size=BULK_BATCH_SIZE
+                )
+                self.after_create(objects)
+        except IntegrityError:
+            errors = [{} for _ in validated_data]
+            self.validate_batch(validated_data, errors)
+            if not any(errors):
+                raise
+            raise serializers.ValidationError(errors)
+        bump_model_version(model)
+        return objects
+
+    def after_create(self, objects):
+        """Обновляет зависимые данные после создания пакета."""
+
+
+class BulkReviewListSerializer(BulkListSerializer):
+    """
+    Пакетное создание отзывов.
+    Одним запросом загружаются упомянутые произведения, ещё одним -
+    уже существующие отзывы тех же авторов на те же произведения.
+    Рейтинг каждого произведения обновляется один раз за пакет.
+    """
+    default_error_messages = {
+        'title_not_found': 'Произведение не найдено.',
+        'duplicate': ReviewSerializer.default_error_messages['duplicate'],
+    }
+
+    def validate_batch(self, items, errors):
+        found = set(Title.objects.filter(
+            pk__in={item['title_id'] for item in items}
+        ).values_list('pk', flat=True))
+        taken = set(Review.objects.filter(
+            title__in=found,
+            author__in={item['author'] for item, item_errors
+                        in zip(items, errors) if 'author' not in item_errors}
+        ).values_list('title_id', 'author_id'))
+        for item, item_errors in zip(items, errors):
+            if item['title_id'] not in found:
+                add_error(item_errors, 'title',
+                          self.error_messages['title_not_found'])
+                continue
+            if 'author' in item_errors:
+                continue
+            pair = (item['title_id'], item['author'].pk)
+            if pair in taken:
+                add_error(item_errors, api_settings.NON_FIELD_ERRORS_KEY,
+                          self.error_messages['duplicate'])
+            taken.add(pair)
+
+    def after_create(self, objects):
+        scores = defaultdict(list)
+        for review in objects:
+            scores[review.title_id].append(review.score)
+        for title_id, added in scores.items():
+            Title.objects.filter(pk=title_id).update_rating(added=added)
+
+
+class BulkReviewSerializer(serializers.ModelSerializer):
+    """Элемент пакета отзывов: произведение задаётся id."""
+    title = serializers.IntegerField(source='title_id')
+    author = serializers.CharField(required=False)
+
+    class Meta:
+        fields = ('title', 'author', 'text', 'score')
+        model = Review
+        list_serializer_class = BulkReviewListSerializer
+
+
+class BulkCommentListSerializer(BulkListSerializer):
+    """
+    Пакетное создание комментариев.
+    Упомянутые отзывы загружаются одним запросом, количество
+    комментариев каждого отзыва сдвигается один раз за пакет.
+    """
+    default_error_messages = {
+        'review_not_found': 'Отзыв не найден.',
+    }
+
+    def validate_batch(self, items, errors):
+        found = set(Review.objects.filter(
+            pk__in={item['review_id'] for item in items}
+        ).values_list('pk', flat=True))
+        for item, item_errors in zip(items, errors):
+            if item['review_id'] not in found:
+                add_error(item_errors, 'review',
+                          self.error_messages['review_not_found'])
+
+    def after_create(self, objects):
+        added = Counter(comment.review_id for comment in objects)
+        for review_id, count in added.items():
+            Review.objects.filter(pk=review_id).shift_comment_count(count)
+
+
+class BulkCommentSerializer(serializers.ModelSerializer):
+    """Элемент пакета комментариев: отзыв задаётся id."""
+    review = serializers.IntegerField(source='review_id')
+    author = serializers.CharField(required=False)
+
+    class Meta:
+        fields = ('review', 'author', 'text')
+        model = Comment
+        list_serializer_class = BulkCommentListSerializer
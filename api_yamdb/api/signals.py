@@ -0,0 +1,51 @@
+"""
+Модуль содержит обработчики сигналов api: инвалидацию кэша
+и публикацию новых комментариев в поток (см. streams.py).
+Версии моделей увеличиваются после фиксации транзакции: иначе запрос,
+выполненный до фиксации, прочитает прежние данные и закэширует их
+под новой версией.
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+from .cache import bump_model_version
+from .streams import broker
+
+VERSIONED_MODELS = (Category, Comment, Genre, GenreTitle, Review, Title)
+
+
+def model_changed(sender, **kwargs):
+    transaction.on_commit(lambda: bump_model_version(sender))
+
+
+def user_changed(sender, created, update_fields=None, **kwargs):
+    """
+    Версия пользователей нужна ответам с именами авторов, поэтому
+    её не меняют регистрация (у нового пользователя нет отзывов)
+    и сохранение только других полей: кода подтверждения, last_login.
+    """
+    if created:
+        return
+    if update_fields is None or 'username' in update_fields:
+        model_changed(sender)
+
+
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: broker.publish(instance))
+
+
+def genre_title_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(lambda: bump_model_version(GenreTitle))
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(model_changed, sender=model)
+    post_delete.connect(model_changed, sender=model)
+post_save.connect(user_changed, sender=User)
+post_delete.connect(model_changed, sender=User)
+m2m_changed.connect(genre_title_changed, sender=Title.genre.through)
+post_save.connect(comment_created, sender=Comment)
@@ -0,0 +1,256 @@
+"""
+Модуль содержит поток новых комментариев отзыва (server-sent events).
+Поток - ASGI-приложение: каждый наблюдатель ждёт события в своей
+очереди asyncio, поэтому ожидание не занимает поток и не делает
+запросов к БД. Комментарии публикуются в очереди из обработчика
+сохранения комментария (см. signals.py) после фиксации транзакции.
+Уведомления не выходят за пределы процесса: наблюдатели получают
+комментарии, сохранённые тем же процессом сервера.
+"""
+import asyncio
+import json
+import re
+import threading
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+from django.db import close_old_connections
+
+from reviews.models import Comment, Review
+from .serializers import CommentCompactSerializer
+
+STREAM_PATH = re.compile(
+    r'^/api/v1/titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)'
+    r'/comments/stream/$'
+)
+
+
+def comment_event(comment):
+    """Возвращает событие SSE с комментарием в компактном формате."""
+    data = json.dumps(CommentCompactSerializer(comment).data,
+                      ensure_ascii=False)
+    return f'id: {comment.pk}\nevent: comment\ndata: {data}\n\n'.encode()
+
+
+class Subscription:
+    """
+    Очередь событий одного наблюдателя в его цикле событий.
+    None в очереди - сигнал сброса: после него события не принимаются.
+    """
+
+    def __init__(self, loop, max_size):
+        self.loop = loop
+        self.queue = asyncio.Queue(max_size)
+        self.closed = False
+
+    def put(self, event):
+        """Кладёт событие в очередь; вызывается из цикла событий."""
+        if self.closed:
+            return
+        if event is None or self.queue.full():
+            self.closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = None
+        self.queue.put_nowait(event)
+
+
+class CommentBroker:
+    """
+    Рассылка новых комментариев наблюдателям отзывов внутри процесса.
+    publish и reset вызываются из любого потока, события передаются
+    в циклы событий наблюдателей через call_soon_threadsafe.
+    Событие сериализуется один раз для всех наблюдателей отзыва
+    и не сериализуется вовсе, если наблюдателей нет.
+    reset сообщает наблюдателям, что список комментариев изменился
+    без отдельных событий и его нужно перечитать; то же получает
+    наблюдатель, не успевающий читать max_queue событий.
+    """
+    max_queue = 100
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+
+    def subscribe(self, review_id):
+        subscription = Subscription(asyncio.get_running_loop(),
+                                    self.max_queue)
+        with self.lock:
+            self.subscriptions[review_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, review_id, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(review_id)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscriptions[review_id]
+
+    def watchers(self, review_id):
+        with self.lock:
+            return len(self.subscriptions.get(review_id, ()))
+
+    def publish(self, comment):
+        if self.watchers(comment.review_id):
+            self.deliver(comment.review_id,
+                         (comment.pk, comment_event(comment)))
+
+    def reset(self, review_id):
+        self.deliver(review_id, None)
+
+    def deliver(self, review_id, event):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(review_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(
+                    subscription.put, event
+                )
+            except RuntimeError:
+                # цикл событий наблюдателя уже закрыт
+                self.unsubscribe(review_id, subscription)
+
+
+broker = CommentBroker()
+
+
+def load_comments(title_id, review_id, after):
+    """
+    Проверяет отзыв произведения и возвращает события комментариев
+    с id больше after. Возвращает None, если отзыв не найден.
+    Выполняется в потоке исполнителя, соединение с БД закрывается.
+    """
+    try:
+        if not Review.objects.filter(pk=review_id,
+                                     title_id=title_id).exists():
+            return None
+        if after is None:
+            return []
+        comments = Comment.objects.filter(
+            review_id=review_id, pk__gt=after
+        ).select_related('author').order_by('pk')
+        return [(comment.pk, comment_event(comment))
+                for comment in comments]
+    finally:
+        close_old_connections()
+
+
+class CommentStream:
+    """
+    ASGI-приложение потока комментариев отзыва:
+    GET /api/v1/titles/{title_id}/reviews/{review_id}/comments/stream/
+    Курсор - id последнего полученного комментария в параметре after
+    или в заголовке Last-Event-ID, который браузер отправляет при
+    переподключении. Комментарии после курсора отправляются сразу,
+    затем - новые по мере сохранения. Без курсора отправляются только
+    новые комментарии. Раз в heartbeat секунд отправляется комментарий
+    SSE, чтобы прокси не закрывали соединение. Если события
+    не передать по одному (переполнение очереди, пакетное создание
+    комментариев), отправляется событие reset и поток закрывается:
+    клиент должен перечитать список комментариев.
+    """
+    heartbeat = 15
+
+    def __init__(self, broker=broker):
+        self.broker = broker
+
+    @staticmethod
+    def match(path):
+        return STREAM_PATH.match(path)
+
+    async def __call__(self, scope, receive, send):
+        match = self.match(scope['path'])
+        if scope['method'] not in ('GET', 'HEAD'):
+            return await self.send_error(send, 405, b'Method Not Allowed')
+        after = self.get_cursor(scope)
+        if after is False:
+            return await self.send_error(send, 400, b'Invalid cursor')
+        review_id = int(match['review_id'])
+        subscription = self.broker.subscribe(review_id)
+        try:
+            backlog = await asyncio.get_running_loop().run_in_executor(
+                None, load_comments, int(match['title_id']), review_id,
+                after
+            )
+            if backlog is None:
+                return await self.send_error(send, 404, b'Not Found')
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream; charset=utf-8'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no'),
+                ],
+            })
+            if scope['method'] == 'HEAD':
+                return await send({'type': 'http.response.body'})
+            await self.stream(send, receive, subscription, backlog)
+        finally:
+            self.broker.unsubscribe(review_id, subscription)
+
+    @staticmethod
+    def get_cursor(scope):
+        """Возвращает id из курсора, None без курсора, False при ошибке."""
+        params = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        value = params.get('after', [None])[-1]
+        if value is None:
+            value = dict(scope.get('headers', ())).get(b'last-event-id')
+            value = value and value.decode('latin-1')
+        if not value:
+            return None
+        return int(value) if value.isdigit() else False
+
+    async def stream(self, send, receive, subscription, backlog):
+        # комментарий, сохранённый между подпиской и чтением backlog,
+        # приходит дважды: из backlog и из очереди
+        sent = set()
+        disconnect = asyncio.ensure_future(self.wait_disconnect(receive))
+        try:
+            for comment_id, event in backlog:
+                sent.add(comment_id)
+                await self.send_chunk(send, event)
+            while not disconnect.done():
+                get = asyncio.ensure_future(subscription.queue.get())
+                done, _ = await asyncio.wait(
+                    (get, disconnect), timeout=self.heartbeat,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if get not in done:
+                    get.cancel()
+                    if not done:
+                        await self.send_chunk(send, b': ping\n\n')
+                    continue
+                item = get.result()
+                if item is None:
+                    await self.send_chunk(send, b'event: reset\ndata: \n\n')
+                    break
+                comment_id, event = item
+                if comment_id in sent:
+                    sent.discard(comment_id)
+                    continue
+                await self.send_chunk(send, event)
+            await send({'type': 'http.response.body'})
+        finally:
+            disconnect.cancel()
+
+    @staticmethod
+    async def wait_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    @staticmethod
+    async def send_chunk(send, body):
+        await send({'type': 'http.response.body', 'body': body,
+                    'more_body': True})
+
+    @staticmethod
+    async def send_error(send, status, body):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+        })
+        await send({'type': 'http.response.body', 'body': body})
@@ -2,8 +2,9 @@
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
 
-from .views import (CategoryViewSet, CommentViewSet, ConfirmAPIView,
-                    GenreViewSet, NewUserAPIView, ReviewViewSet, TitleViewSet,
+from .views import (CategoryViewSet, CommentBulkCreateAPIView, CommentViewSet,
+                    ConfirmAPIView, GenreViewSet, NewUserAPIView,
+                    ReviewBulkCreateAPIView, ReviewViewSet, TitleViewSet,
                     UserViewSet)
 
 app_name = 'api'
@@ -27,5 +28,9 @@ v1_router.register(
 urlpatterns = [
     path('v1/auth/signup/', NewUserAPIView.as_view(), name='new_user'),
     path('v1/auth/token/', ConfirmAPIView.as_view(), name='confirm_user'),
+    path('v1/reviews/bulk/', ReviewBulkCreateAPIView.as_view(),
+         name='reviews_bulk'),
+    path('v1/comments/bulk/', CommentBulkCreateAPIView.as_view(),
+         name='comments_bulk'),
     path('v1/', include(v1_router.urls)),
 ]
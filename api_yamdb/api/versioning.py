@@ -0,0 +1,13 @@
+"""Модуль содержит схемы версионирования ответов API."""
+from rest_framework.versioning import AcceptHeaderVersioning
+
+
+class CommentVersioning(AcceptHeaderVersioning):
+    """
+    Версия формата комментариев из заголовка Accept, например
+    `Accept: application/json; version=2`.
+    Без версии отдаётся прежний формат (1) с текстом отзыва,
+    версия 2 - компактный формат с id отзыва.
+    """
+    default_version = '1'
+    allowed_versions = ('1', '2')
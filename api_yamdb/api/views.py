@@ -1,60 +1,205 @@
 """Модуль содержит вьюсеты и вью-классы."""
+from collections import OrderedDict
+
 from django.core.mail import EmailMessage
-from django.db.models import Avg
+from django.db import transaction
+from django.db.models import Count, F, IntegerField
+from django.db.models.expressions import ExpressionWrapper
 from django.shortcuts import get_object_or_404
-from rest_framework import filters, permissions, status, viewsets
+from django.utils.cache import patch_vary_headers
+from rest_framework import (filters, generics, permissions, status,
+                            viewsets)
 from rest_framework.decorators import action
-from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from reviews.models import Category, Genre, Review, Title, User
-from .filters import TitleFilter
-from .mixins import (CreateByAdminOrReadOnlyModelMixin,
-                     CreateOrChangeByAdminOrReadOnlyModelMixin, PostByAny)
+from reviews.models import (Category, Comment, Genre, GenreTitle,
+                            Recommendation, Review, SimilarTitle, Title, User)
+from .filters import TitleFilter, parse_ids
+from .mixins import (BulkCreateMixin, CachedListMixin, CachedListRetrieveMixin,
+                     ConditionalReadMixin, CreateByAdminOrReadOnlyModelMixin,
+                     CreateOrChangeByAdminOrReadOnlyModelMixin,
+                     NestedParentMixin, PostByAny, SparseQuerysetMixin,
+                     TopTitlesMixin, get_limit_param, serialize_titles)
+from .pagination import CachedCountPagination, KeysetOrLimitOffsetPagination
 from .permissions import (AdminOnly, AdminOrReadonly,
                           AuthorModeratorAdminOrReadonly)
-from .serializers import (CategorySerializer, CommentSerializer,
-                          ConfirmationSerializer, GenreSerializer,
-                          ReadTitleSerializer, ReviewSerializer,
-                          TitleSerializer, UserCreateSerializer,
-                          UserSerializer)
+from .serializers import (BulkCommentSerializer, BulkReviewSerializer,
+                          CategorySerializer, CommentCompactSerializer,
+                          CommentSerializer, ConfirmationSerializer,
+                          GenreSerializer, ReadTitleHistogramSerializer,
+                          ReadTitleSerializer, ReadTitleValuesSerializer,
+                          ReviewSerializer, TitleSerializer,
+                          UserCreateSerializer, UserSerializer)
+from .streams import broker
+from .versioning import CommentVersioning
 
 
-class CategoryViewSet(CreateByAdminOrReadOnlyModelMixin):
-    """Вьюсет для модели Category."""
+class CategoryViewSet(CachedListMixin, TopTitlesMixin,
+                      CreateByAdminOrReadOnlyModelMixin):
+    """
+    Вьюсет для модели Category. Ответы на чтение кэшируются.
+    Лучшие произведения категории выбираются по индексу
+    (category, rating, id) модели Title.
+    """
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
-    pagination_class = LimitOffsetPagination
+    response_cache_models = (Category, )
+    pagination_class = CachedCountPagination
     search_fields = ('name',)
     lookup_field = 'slug'
     filter_backends = (filters.SearchFilter,)
+    top_title_field = 'category'
 
 
-class GenreViewSet(CreateByAdminOrReadOnlyModelMixin):
-    """Вьюсет для модели Genre."""
+class GenreViewSet(CachedListMixin, TopTitlesMixin,
+                   CreateByAdminOrReadOnlyModelMixin):
+    """
+    Вьюсет для модели Genre. Ответы на чтение кэшируются.
+    Лучшие произведения жанра выбираются по индексу
+    (genre, rating, title) модели GenreTitle.
+    """
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
-    pagination_class = LimitOffsetPagination
+    response_cache_models = (Genre, )
+    pagination_class = CachedCountPagination
     search_fields = ('name',)
     lookup_field = 'slug'
     filter_backends = (filters.SearchFilter,)
 
+    def get_top_title_ids(self, genre, limit):
+        return GenreTitle.objects.filter(
+            genre=genre, rating__isnull=False
+        ).order_by('-rating', '-title_id').values_list(
+            'title_id', flat=True
+        )[:limit]
 
-class TitleViewSet(CreateOrChangeByAdminOrReadOnlyModelMixin):
+
+class TitleViewSet(ConditionalReadMixin, CachedListRetrieveMixin,
+                   SparseQuerysetMixin,
+                   CreateOrChangeByAdminOrReadOnlyModelMixin):
     """
     Вьюсет для модели Title.
     Для метода GET применяется сериализатор ReadTitleSerializer.
     Для других методов применяется сериализатор TitleSerializer.
-    Добавляется динамическое поле, содержащее агрегирующую функцию.
+    Рейтинг читается из хранимого поля модели, без агрегации отзывов.
+    Категория и жанры загружаются фиксированным числом запросов
+    независимо от размера страницы.
+    Ответы на чтение кэшируются, включая версию отзывов, от которых
+    зависит рейтинг. Поддерживаются условные запросы по ETag.
+    Список сериализуется из QuerySet.values() сериализатором
+    ReadTitleValuesSerializer.
+    Гистограмма оценок добавляется к объекту по параметру histogram=true.
+    Параметр fields ограничивает поля ответа, столбцы и связи в запросе.
+    GET bulk/?ids=1,2,3 возвращает произведения по списку id в порядке
+    запроса, без пагинации и фиксированным числом запросов.
+    GET facets/ с параметрами TitleFilter возвращает количество
+    отфильтрованных произведений по жанрам, категориям и интервалам
+    годов длиной facet_year_bucket, по одному запросу с группировкой
+    на каждый срез.
+    GET {id}/similar/ возвращает похожие произведения, заранее
+    рассчитанные командой buildsimilar, с полем similarity.
     """
-    queryset = Title.objects.annotate(rating=Avg('reviews__score')).all()
+    queryset = (Title.objects.select_related('category')
+                .prefetch_related('genre'))
     serializer_class = TitleSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = KeysetOrLimitOffsetPagination
+    cursor_ordering = ('category__name', 'name', '-year', 'id')
+    cache_models = (Title, GenreTitle, Genre, Category)
+    response_cache_models = cache_models + (Review, )
+    etag_models = response_cache_models
     filterset_class = TitleFilter
+    values_actions = ('list', 'bulk')
+    facet_year_bucket = 10
+    similar_default_limit = 10
+    similar_max_limit = 50
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in self.values_actions:
+            return ReadTitleValuesSerializer.prepare_queryset(
+                queryset, self.request, self.get_sparse_required_fields()
+            )
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in self.values_actions and kwargs.get('many'):
+            kwargs.setdefault('context', self.get_serializer_context())
+            return ReadTitleValuesSerializer(*args, **kwargs)
+        return super().get_serializer(*args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def bulk(self, request):
+        return self.cached_response(self.get_bulk_response, request)
+
+    def get_bulk_response(self, request):
+        if not request.query_params.get('ids'):
+            raise ValidationError({'ids': 'Обязательный параметр.'})
+        ids = parse_ids(request.query_params['ids'])
+        rows = self.filter_queryset(self.get_queryset()).order_by()
+        rows_by_id = {row['id']: row for row in rows}
+        serializer = self.get_serializer(
+            [rows_by_id[pk] for pk in ids if pk in rows_by_id], many=True
+        )
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        return self.cached_response(self.get_facets_response, request)
+
+    def get_facets_response(self, request):
+        titles = self.filter_queryset(self.get_queryset()).order_by()
+        titles = titles.select_related(None).prefetch_related(None)
+        genres = titles.filter(genre__isnull=False).values(
+            'genre__slug', 'genre__name'
+        ).annotate(count=Count('pk')).order_by('genre__slug')
+        categories = titles.values(
+            'category__slug', 'category__name'
+        ).annotate(count=Count('pk')).order_by('category__slug')
+        size = self.facet_year_bucket
+        years = titles.annotate(bucket=ExpressionWrapper(
+            F('year') / size * size, output_field=IntegerField()
+        )).values('bucket').annotate(count=Count('pk')).order_by('bucket')
+        return Response({
+            'count': titles.count(),
+            'genre': [
+                {'slug': row['genre__slug'], 'name': row['genre__name'],
+                 'count': row['count']}
+                for row in genres
+            ],
+            'category': [
+                {'slug': row['category__slug'],
+                 'name': row['category__name'], 'count': row['count']}
+                for row in categories
+            ],
+            'year': [
+                {'from': row['bucket'], 'to': row['bucket'] + size - 1,
+                 'count': row['count']}
+                for row in years
+            ],
+        })
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        limit = get_limit_param(
+            request, self.similar_default_limit, self.similar_max_limit
+        )
+        scores = OrderedDict(SimilarTitle.objects.filter(
+            title_id=pk
+        ).order_by('-score').values_list('similar_id', 'score')[:limit])
+        if not scores:
+            get_object_or_404(Title, pk=pk)
+        data = serialize_titles(list(scores))
+        for title in data:
+            title['similarity'] = scores[title['id']]
+        return Response(data)
 
     def get_serializer_class(self):
         if self.request.method in permissions.SAFE_METHODS:
+            histogram = self.request.query_params.get('histogram', '')
+            if self.action == 'retrieve' and histogram.lower() == 'true':
+                return ReadTitleHistogramSerializer
             return ReadTitleSerializer
         return TitleSerializer
 
@@ -64,12 +209,16 @@ class UserViewSet(viewsets.ModelViewSet):
     Вьюсет для модели User.
     Доступен только администраторам.
     Получение экземпляра модели User по полю username.
+    GET me/recommendations/ возвращает рекомендации текущему
+    пользователю, заранее рассчитанные командой buildrecommendations.
     """
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = (AdminOnly, )
-    pagination_class = LimitOffsetPagination
+    pagination_class = CachedCountPagination
     lookup_field = 'username'
+    recommendations_default_limit = 10
+    recommendations_max_limit = 100
 
     @action(
         methods=['get', 'patch'],
@@ -99,6 +248,26 @@ class UserViewSet(viewsets.ModelViewSet):
                             status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(
+        methods=['get'],
+        detail=False,
+        url_path='me/recommendations',
+        permission_classes=[permissions.IsAuthenticated, ]
+    )
+    def recommendations(self, request):
+        limit = get_limit_param(
+            request,
+            self.recommendations_default_limit,
+            self.recommendations_max_limit
+        )
+        scores = OrderedDict(Recommendation.objects.filter(
+            user=request.user
+        ).order_by('-score').values_list('title_id', 'score')[:limit])
+        data = serialize_titles(list(scores))
+        for title in data:
+            title['predicted_score'] = scores[title['id']]
+        return Response(data)
+
 
 class NewUserAPIView(PostByAny):
     """
@@ -153,19 +322,47 @@ class ConfirmAPIView(PostByAny):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
-    """Вьюсет для модели Review."""
+class ReviewViewSet(ConditionalReadMixin, SparseQuerysetMixin,
+                    NestedParentMixin, viewsets.ModelViewSet):
+    """
+    Вьюсет для модели Review.
+    Изменения отзывов выполняются в транзакции вместе с обновлением
+    хранимого рейтинга произведения.
+    Поддерживаются условные запросы по ETag и дате публикации.
+    Параметр fields ограничивает поля ответа и запрос к БД.
+    Произведение загружается только при создании отзыва, один раз
+    за запрос; для списка проверяется его существование, отзыв
+    выбирается сразу по id произведения. Автор выбирается тем же
+    запросом, что и отзывы. Версия комментариев входит в ETag:
+    от них зависит количество комментариев отзыва.
+    """
     serializer_class = ReviewSerializer
     permission_classes = (AuthorModeratorAdminOrReadonly,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = KeysetOrLimitOffsetPagination
+    cursor_ordering = ('-pub_date', '-pk')
+    etag_models = (Review, Comment, User)
+    last_modified_field = 'pub_date'
+    parent_model = Title
+    parent_lookups = {'pk': 'title_id'}
 
     def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        return title.reviews.all()
+        if self.action == 'list':
+            self.check_parent_exists()
+        return Review.objects.select_related('author').filter(
+            title_id=self.kwargs['title_id']
+        )
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author=self.request.user, title=self.get_parent())
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
 
     def get_permissions(self):
         if self.action in ('list', 'retrieve'):
@@ -173,25 +370,92 @@ class ReviewViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
 
-class CommentViewSet(viewsets.ModelViewSet):
-    """Вьюсет для модели Comment."""
+class CommentViewSet(ConditionalReadMixin, SparseQuerysetMixin,
+                     NestedParentMixin, viewsets.ModelViewSet):
+    """
+    Вьюсет для модели Comment.
+    Поддерживаются условные запросы по ETag и дате публикации.
+    Параметр fields ограничивает поля ответа и запрос к БД.
+    Отзыв загружается только при создании комментария, один раз
+    за запрос; для списка проверяется его существование, а отдельный
+    комментарий выбирается вместе с проверкой произведения отзыва.
+    Автор (и отзыв в формате версии 1) выбирается тем же запросом.
+    Изменения комментариев выполняются в транзакции вместе
+    с обновлением количества комментариев отзыва.
+    Формат ответа выбирается версией из заголовка Accept
+    (см. CommentVersioning): версия 2 возвращает id отзыва вместо
+    его текста.
+    """
     serializer_class = CommentSerializer
+    versioning_class = CommentVersioning
     permission_classes = (AuthorModeratorAdminOrReadonly,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = KeysetOrLimitOffsetPagination
+    cursor_ordering = ('-pub_date', '-pk')
+    etag_models = (Comment, Review, User)
+    last_modified_field = 'pub_date'
+    parent_model = Review
+    parent_lookups = {'pk': 'review_id', 'title_id': 'title_id'}
+
+    def get_serializer_class(self):
+        if self.request.version == '2':
+            return CommentCompactSerializer
+        return CommentSerializer
 
     def get_queryset(self):
-        review_id = self.kwargs.get('review_id')
-        title_id = self.kwargs.get('title_id')
-        review = get_object_or_404(Review, pk=review_id, title__id=title_id)
-        return review.comments.all()
+        queryset = Comment.objects.select_related('author').filter(
+            review_id=self.kwargs['review_id']
+        )
+        if self.get_serializer_class() is CommentSerializer:
+            queryset = queryset.select_related('review')
+        if self.action == 'list':
+            self.check_parent_exists()
+            return queryset
+        return queryset.filter(review__title_id=self.kwargs['title_id'])
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        review_id = self.kwargs.get('review_id')
-        title_id = self.kwargs.get('title_id')
-        review = get_object_or_404(Review, pk=review_id, title__id=title_id)
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_parent())
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        patch_vary_headers(response, ('Accept', ))
+        return response
 
     def get_permissions(self):
         if self.action in ('list', 'retrieve'):
             return (AdminOrReadonly(),)
         return super().get_permissions()
+
+
+class ReviewBulkCreateAPIView(BulkCreateMixin, generics.GenericAPIView):
+    """
+    Пакетное создание отзывов на разные произведения одним запросом.
+    Рейтинг каждого произведения обновляется один раз за пакет.
+    """
+    serializer_class = BulkReviewSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+
+class CommentBulkCreateAPIView(BulkCreateMixin, generics.GenericAPIView):
+    """
+    Пакетное создание комментариев к разным отзывам одним запросом.
+    Созданные комментарии публикуются в потоки их отзывов. Если БД
+    не вернула id созданных строк (SQLite), наблюдатели отзывов
+    получают сброс и перечитывают список комментариев.
+    """
+    serializer_class = BulkCommentSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def bulk_created(self, objects):
+        if all(comment.pk is not None for comment in objects):
+            for comment in objects:
+                broker.publish(comment)
+            return
+        for review_id in {comment.review_id for comment in objects}:
+            broker.reset(review_id)
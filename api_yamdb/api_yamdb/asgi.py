@@ -1,7 +1,133 @@
+"""
+ASGI-приложение проекта.
+Поток комментариев (api.streams.CommentStream) обслуживается
+асинхронно, остальные запросы передаются WSGI-приложению Django
+в пуле потоков: Django 2.2 не поддерживает ASGI. Так поток и запросы,
+сохраняющие комментарии, работают в одном процессе и уведомления
+о новых комментариях доходят до наблюдателей.
+Запуск любым ASGI-сервером, например:
+    uvicorn api_yamdb.asgi:application
+"""
+import asyncio
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 
-from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
-application = get_asgi_application()
+wsgi_application = get_wsgi_application()
+
+from api.streams import CommentStream  # noqa: E402 после django.setup()
+
+WSGI_THREADS = 16
+
+
+class WsgiToAsgi:
+    """
+    Выполняет WSGI-приложение для HTTP-запросов ASGI в пуле потоков.
+    Тело запроса и ответа буферизуется целиком.
+    """
+
+    def __init__(self, application, threads=WSGI_THREADS):
+        self.application = application
+        self.executor = ThreadPoolExecutor(threads)
+
+    async def __call__(self, scope, receive, send):
+        body = BytesIO()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+        status, headers, content = await asyncio.get_running_loop(
+        ).run_in_executor(
+            self.executor, self.run, self.get_environ(scope, body)
+        )
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+    @staticmethod
+    def get_environ(scope, body):
+        server_name, server_port = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server_name,
+            'SERVER_PORT': str(server_port),
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', ()):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = f'HTTP_{name}'
+            if name in environ:
+                value = f'{environ[name]},{value}'
+            environ[name] = value
+        return environ
+
+    def run(self, environ):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        chunks = self.application(environ, start_response)
+        try:
+            content = b''.join(chunks)
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        return response['status'], response['headers'], content
+
+
+class Application:
+    """Маршрутизирует запросы ASGI между потоком комментариев и Django."""
+
+    def __init__(self, stream, fallback):
+        self.stream = stream
+        self.fallback = fallback
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип соединения: '
+                             f'{scope["type"]}')
+        if self.stream.match(scope['path']):
+            return await self.stream(scope, receive, send)
+        return await self.fallback(scope, receive, send)
+
+    @staticmethod
+    async def lifespan(receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = Application(CommentStream(), WsgiToAsgi(wsgi_application))
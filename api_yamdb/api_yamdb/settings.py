@@ -25,8 +25,8 @@ INSTALLED_APPS = [
     'django_filters',
     'rest_framework_simplejwt',
     'rest_framework',
-    'reviews',
-    'api',
+    'reviews.apps.ReviewsConfig',
+    'api.apps.ApiConfig',
 ]
 
 MIDDLEWARE = [
@@ -129,6 +129,12 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Наибольшее число id в параметре ids списка произведений.
+TITLE_IDS_LIMIT = 100
+
+# Наибольшее число элементов в пакете отзывов или комментариев.
+BULK_CREATE_LIMIT = 1000
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=10),
 }
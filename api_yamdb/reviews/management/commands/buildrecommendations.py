@@ -0,0 +1,261 @@
+"""
+Модуль содержит команду расчёта персональных рекомендаций.
+Матрица оценок пользователь x произведение раскладывается на факторы
+методом чередующихся наименьших квадратов (ALS) с регуляризацией,
+учитываются только известные оценки. На каждом шаге факторы одной
+стороны решаются независимо для порций строк, поэтому порции можно
+распределить по процессам (--workers).
+Для каждого пользователя сохраняются top-N произведений без его отзыва
+с наибольшей предсказанной оценкой (модель Recommendation).
+Команда выводит время и скорость обучения и записи рекомендаций.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from scipy import sparse
+
+from reviews.models import Recommendation, Review
+from reviews.scores import BATCH_SIZE, READ_CHUNK, chunks, load_scores
+
+RMSE_CHUNK = 100000
+
+
+def solve_factors(indptr, indices, data, fixed, regularization):
+    """
+    Решает задачу наименьших квадратов для порции строк матрицы CSR
+    при фиксированных факторах другой стороны.
+    Регуляризация пропорциональна числу оценок строки (ALS-WR).
+    Возвращает факторы строк порции.
+    """
+    rated = fixed[indices]
+    weighted = rated * data[:, None]
+    offsets = indptr - indptr[0]
+    size, factors = len(indptr) - 1, fixed.shape[1]
+    gram = np.empty((size, factors, factors))
+    rhs = np.empty((size, factors))
+    for row in range(size):
+        start, end = offsets[row], offsets[row + 1]
+        gram[row] = rated[start:end].T @ rated[start:end]
+        rhs[row] = weighted[start:end].sum(axis=0)
+    counts = np.maximum(np.diff(indptr), 1)
+    gram += regularization * counts[:, None, None] * np.eye(factors)
+    return np.linalg.solve(gram, rhs[..., None])[..., 0]
+
+
+def recommend(user_factors, item_factors, indptr, indices, top_n):
+    """
+    Возвращает для порции пользователей номера top_n произведений
+    с наибольшей предсказанной оценкой и сами оценки.
+    Произведения с оценкой пользователя исключаются.
+    Оценки считаются в float32: для ранжирования точности достаточно,
+    а память и время на порцию вдвое меньше.
+    """
+    scores = (user_factors.astype(np.float32)
+              @ item_factors.astype(np.float32).T)
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    scores[rows, indices] = -np.inf
+    top_n = min(top_n, scores.shape[1])
+    if top_n == 0:
+        return scores[:, :0].astype(np.int64), scores[:, :0]
+    top = np.argpartition(
+        scores, scores.shape[1] - top_n, axis=1
+    )[:, -top_n:]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return (np.take_along_axis(top, order, axis=1),
+            np.take_along_axis(top_scores, order, axis=1))
+
+
+def row_chunks(matrix, chunk_size):
+    """
+    Делит строки матрицы CSR на порции. Возвращает номера первых строк
+    порций и аргументы (indptr, indices, data) для каждой порции.
+    """
+    for start in range(0, matrix.shape[0], chunk_size):
+        end = min(start + chunk_size, matrix.shape[0])
+        first, last = matrix.indptr[start], matrix.indptr[end]
+        yield start, (matrix.indptr[start:end + 1],
+                      matrix.indices[first:last],
+                      matrix.data[first:last])
+
+
+class Command(BaseCommand):
+    help = 'Расчёт персональных рекомендаций разложением матрицы оценок'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        authors, titles, scores = load_scores(options['read_chunk'])
+        self.user_ids, rows = np.unique(authors, return_inverse=True)
+        self.title_ids, columns = np.unique(titles, return_inverse=True)
+        matrix = sparse.csr_matrix(
+            (scores.astype(np.float64), (rows, columns)),
+            shape=(len(self.user_ids), len(self.title_ids))
+        )
+        self.stdout.write(
+            f'Прочитано оценок: {matrix.nnz}, пользователей: '
+            f'{matrix.shape[0]}, произведений: {matrix.shape[1]} '
+            f'за {time.perf_counter() - started:.1f} с.'
+        )
+        workers = options['workers']
+        pool = ProcessPoolExecutor(workers) if workers > 1 else None
+        try:
+            user_factors, item_factors = self.train(matrix, options, pool)
+            self.write_recommendations(
+                matrix, user_factors, item_factors, options, pool
+            )
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.stdout.write(
+            f'Готово за {time.perf_counter() - started:.1f} с.'
+        )
+
+    def map(self, pool, func, tasks):
+        if pool is None:
+            return [func(*task) for task in tasks]
+        return list(pool.map(func, *zip(*tasks)))
+
+    def solve(self, matrix, fixed, options, pool):
+        tasks = [
+            (*arrays, fixed, options['regularization'])
+            for _, arrays in row_chunks(matrix, options['chunk_size'])
+        ]
+        if not tasks:
+            return np.empty((0, fixed.shape[1]))
+        return np.vstack(self.map(pool, solve_factors, tasks))
+
+    def train(self, matrix, options, pool):
+        rng = np.random.default_rng(options['seed'])
+        factors = options['factors']
+        user_factors = rng.normal(0, 0.1, (matrix.shape[0], factors))
+        item_factors = rng.normal(0, 0.1, (matrix.shape[1], factors))
+        by_item = matrix.T.tocsr()
+        for iteration in range(1, options['iterations'] + 1):
+            started = time.perf_counter()
+            user_factors = self.solve(matrix, item_factors, options, pool)
+            item_factors = self.solve(by_item, user_factors, options, pool)
+            elapsed = time.perf_counter() - started
+            rmse = self.rmse(matrix, user_factors, item_factors)
+            self.stdout.write(
+                f'Итерация {iteration}: RMSE {rmse:.4f}, {elapsed:.2f} с '
+                f'({2 * matrix.nnz / elapsed if elapsed else 0:.0f} '
+                f'оценок/с).'
+            )
+        return user_factors, item_factors
+
+    def rmse(self, matrix, user_factors, item_factors):
+        """Среднеквадратичная ошибка на известных оценках."""
+        coo = matrix.tocoo()
+        error = 0.0
+        for start in range(0, coo.nnz, RMSE_CHUNK):
+            rows = coo.row[start:start + RMSE_CHUNK]
+            columns = coo.col[start:start + RMSE_CHUNK]
+            predicted = np.einsum(
+                'ij,ij->i', user_factors[rows], item_factors[columns]
+            )
+            error += np.square(
+                predicted - coo.data[start:start + RMSE_CHUNK]
+            ).sum()
+        return np.sqrt(error / coo.nnz) if coo.nnz else 0.0
+
+    def write_recommendations(self, matrix, user_factors, item_factors,
+                              options, pool):
+        started = time.perf_counter()
+        tasks = []
+        firsts = []
+        for first, (indptr, indices, _) in row_chunks(
+            matrix, options['chunk_size']
+        ):
+            firsts.append(first)
+            tasks.append((user_factors[first:first + len(indptr) - 1],
+                          item_factors, indptr, indices, options['top_n']))
+        results = self.map(pool, recommend, tasks)
+        self.stdout.write(
+            f'Рекомендации рассчитаны за '
+            f'{time.perf_counter() - started:.1f} с.'
+        )
+        started = time.perf_counter()
+        written = 0
+        for first, (top, scores) in zip(firsts, results):
+            user_ids = self.user_ids[first:first + len(top)].tolist()
+            recommendations = [
+                Recommendation(user_id=user_id, title_id=title_id,
+                               score=score)
+                for user_id, columns, values in zip(
+                    user_ids, top, scores.tolist()
+                )
+                for title_id, score in zip(
+                    self.title_ids[columns].tolist(), values
+                )
+                if score > -np.inf
+            ]
+            with transaction.atomic():
+                for batch in chunks(user_ids):
+                    Recommendation.objects.filter(user__in=batch).delete()
+                Recommendation.objects.bulk_create(
+                    recommendations, batch_size=BATCH_SIZE
+                )
+            written += len(user_ids)
+        Recommendation.objects.exclude(
+            user__in=Review.objects.values('author')
+        ).delete()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Рекомендации записаны для {written} пользователей '
+            f'за {elapsed:.1f} с '
+            f'({written / elapsed if elapsed else 0:.0f} пользователей/с).'
+        )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-n',
+            '--top-n',
+            type=int,
+            default=20,
+            help='Количество рекомендаций для каждого пользователя'
+        )
+        parser.add_argument(
+            '--factors',
+            type=int,
+            default=32,
+            help='Размерность факторов'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=10,
+            help='Количество итераций ALS'
+        )
+        parser.add_argument(
+            '--regularization',
+            type=float,
+            default=0.05,
+            help='Коэффициент регуляризации'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Количество строк матрицы в одной порции расчёта'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Количество процессов для расчёта порций'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Начальное значение генератора случайных факторов'
+        )
+        parser.add_argument(
+            '--read-chunk',
+            type=int,
+            default=READ_CHUNK,
+            help='Количество отзывов, читаемых за один запрос'
+        )
@@ -0,0 +1,228 @@
+"""
+Модуль содержит команду расчёта похожих произведений.
+Оценки из отзывов читаются порциями в разреженную матрицу
+пользователь x произведение (scipy.sparse), столбцы нормируются.
+Косинусное сходство считается произведением транспонированной матрицы
+на блоки столбцов, поэтому память ограничена размером блока,
+а не квадратом числа произведений.
+Для каждого произведения хранятся top-K похожих (модель SimilarTitle).
+
+По умолчанию пересчёт инкрементальный: обрабатываются произведения
+с флагом similar_stale, который выставляет обновление рейтинга.
+Их списки строятся заново, а в списки остальных произведений
+вливаются новые значения сходства с ними. Для каждого из остальных
+произведений после каждого блока остаются только top-K новых значений,
+поэтому память не зависит от доли устаревших произведений. Если изменившееся
+произведение вытеснило из списка другое, а затем его сходство упало,
+вытесненное произведение вернётся только после полного пересчёта
+(--full).
+"""
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from scipy import sparse
+
+from reviews.models import SimilarTitle, Title
+from reviews.scores import (BATCH_SIZE, READ_CHUNK, chunks, load_scores,
+                            top_k, top_k_per_group)
+
+
+class ScoreMatrix:
+    """Матрица оценок пользователь x произведение, столбцы нормированы."""
+
+    def __init__(self, authors, titles, scores):
+        self.title_ids, columns = np.unique(titles, return_inverse=True)
+        _, rows = np.unique(authors, return_inverse=True)
+        matrix = sparse.csc_matrix(
+            (scores.astype(np.float32), (rows, columns)),
+            shape=(rows.max() + 1 if len(rows) else 0, len(self.title_ids))
+        )
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)))
+        self.normalized = (matrix @ sparse.diags(1 / norms.ravel())).tocsc()
+        self.transposed = self.normalized.T.tocsr()
+
+    def columns_of(self, title_ids):
+        """Возвращает номера столбцов произведений, у которых есть оценки."""
+        title_ids = np.asarray(title_ids, dtype=np.int64)
+        positions = np.searchsorted(self.title_ids, title_ids)
+        positions[positions == len(self.title_ids)] = 0
+        found = self.title_ids[positions] == title_ids
+        return positions[found]
+
+    def similarity_blocks(self, columns, block_size):
+        """
+        Для блоков столбцов возвращает пары (столбцы, сходство):
+        сходство - разреженная матрица CSC размером
+        число произведений x размер блока.
+        """
+        for block in chunks(columns, block_size):
+            yield block, (self.transposed @ self.normalized[:, block]).tocsc()
+
+
+def write_similar(similar):
+    """Заменяет списки похожих для произведений из словаря similar."""
+    with transaction.atomic():
+        SimilarTitle.objects.filter(title__in=list(similar)).delete()
+        SimilarTitle.objects.bulk_create(
+            (SimilarTitle(title_id=title_id, similar_id=similar_id,
+                          score=score)
+             for title_id, items in similar.items()
+             for similar_id, score in items),
+            batch_size=BATCH_SIZE
+        )
+
+
+class Command(BaseCommand):
+    help = 'Расчёт похожих произведений по косинусному сходству оценок'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stale = self.take_stale_titles(options['full'])
+        try:
+            self.build(stale, options)
+        except BaseException:
+            for title_ids in chunks(stale):
+                Title.objects.filter(pk__in=title_ids).update(
+                    similar_stale=True
+                )
+            raise
+        self.stdout.write(
+            f'Готово за {time.perf_counter() - started:.1f} с.'
+        )
+
+    def take_stale_titles(self, full):
+        """Возвращает id устаревших произведений и снимает с них флаг."""
+        titles = Title.objects.order_by('pk')
+        if not full:
+            titles = titles.filter(similar_stale=True)
+        stale = list(titles.values_list('pk', flat=True))
+        for title_ids in chunks(stale):
+            Title.objects.filter(pk__in=title_ids).update(similar_stale=False)
+        return stale
+
+    def build(self, stale, options):
+        k = options['top_k']
+        started = time.perf_counter()
+        matrix = ScoreMatrix(*load_scores(options['read_chunk']))
+        self.stdout.write(
+            f'Прочитано оценок: {matrix.normalized.nnz}, '
+            f'произведений с оценками: {len(matrix.title_ids)} '
+            f'за {time.perf_counter() - started:.1f} с.'
+        )
+        started = time.perf_counter()
+        title_ids = matrix.title_ids
+        stale_set = set(stale)
+        is_stale = np.isin(title_ids, stale)
+        candidates = np.empty((0, 3))
+        written = 0
+        for block, similarity in matrix.similarity_blocks(
+            matrix.columns_of(stale), options['block_size']
+        ):
+            similar = {}
+            for position, column in enumerate(block):
+                start, end = similarity.indptr[position:position + 2]
+                rows = similarity.indices[start:end]
+                values = similarity.data[start:end]
+                keep = rows != column
+                rows, values = top_k(rows[keep], values[keep], k)
+                similar[int(title_ids[column])] = list(zip(
+                    title_ids[rows].tolist(), values.tolist()
+                ))
+            write_similar(similar)
+            written += len(similar)
+            coo = similarity.tocoo()
+            keep = ~is_stale[coo.row]
+            candidates = np.concatenate((candidates, np.column_stack((
+                title_ids[coo.row[keep]],
+                title_ids[block][coo.col[keep]],
+                coo.data[keep],
+            ))))
+            candidates = candidates[
+                top_k_per_group(candidates[:, 0], candidates[:, 2], k)
+            ]
+        without_scores = sorted(stale_set - set(title_ids.tolist()))
+        for batch in chunks(without_scores):
+            SimilarTitle.objects.filter(title__in=batch).delete()
+        written += self.merge_candidates(candidates, stale, stale_set, k)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Обновлено списков похожих: {written} за {elapsed:.1f} с '
+            f'({written / elapsed if elapsed else 0:.0f} произведений/с).'
+        )
+
+    def merge_candidates(self, candidates, stale, stale_set, k):
+        """
+        Вливает сходство с устаревшими произведениями в списки
+        остальных произведений. Перезаписываются только изменившиеся
+        списки. Возвращает их количество.
+        candidates - строки (произведение, устаревшее произведение,
+        сходство), отсортированные по произведению, не больше k строк
+        на произведение.
+        """
+        keys = candidates[:, 0]
+        affected = set(keys.astype(np.int64).tolist())
+        for title_ids in chunks(stale):
+            affected.update(SimilarTitle.objects.filter(
+                similar__in=title_ids
+            ).values_list('title_id', flat=True))
+        affected = sorted(affected - stale_set)
+        written = 0
+        for batch in chunks(affected):
+            stored = {title_id: set() for title_id in batch}
+            for title_id, similar_id, score in SimilarTitle.objects.filter(
+                title__in=batch
+            ).values_list('title_id', 'similar_id', 'score'):
+                stored[title_id].add((similar_id, score))
+            start = np.searchsorted(keys, batch[0], side='left')
+            end = np.searchsorted(keys, batch[-1], side='right')
+            merged = {
+                title_id: {similar_id: score
+                           for similar_id, score in items
+                           if similar_id not in stale_set}
+                for title_id, items in stored.items()
+            }
+            for title_id, similar_id, score in candidates[start:end]:
+                merged[int(title_id)][int(similar_id)] = float(score)
+            similar = {}
+            for title_id, items in merged.items():
+                indices, values = top_k(
+                    np.fromiter(items, dtype=np.int64, count=len(items)),
+                    np.fromiter(items.values(), dtype=np.float64,
+                                count=len(items)),
+                    k
+                )
+                items = list(zip(indices.tolist(), values.tolist()))
+                if set(items) != stored[title_id]:
+                    similar[title_id] = items
+            write_similar(similar)
+            written += len(similar)
+        return written
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            default=False,
+            help='Пересчитать похожие для всех произведений'
+        )
+        parser.add_argument(
+            '-k',
+            '--top-k',
+            type=int,
+            default=20,
+            help='Количество похожих произведений для каждого произведения'
+        )
+        parser.add_argument(
+            '--block-size',
+            type=int,
+            default=256,
+            help='Количество столбцов матрицы в одном блоке расчёта'
+        )
+        parser.add_argument(
+            '--read-chunk',
+            type=int,
+            default=READ_CHUNK,
+            help='Количество отзывов, читаемых за один запрос'
+        )
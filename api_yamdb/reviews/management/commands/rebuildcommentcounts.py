@@ -0,0 +1,73 @@
+"""
+Модуль содержит команду проверки и пересчёта количества комментариев
+отзывов. Количество комментариев всех отзывов считается одним запросом
+с группировкой по отзыву, расходящиеся отзывы обновляются пакетно
+через bulk_update. bulk_update не отправляет сигналы, поэтому после
+исправления версия Review увеличивается явно: ETag с прежним
+количеством комментариев устаревают.
+Количество отзывов произведения - это количество оценок score_count,
+его проверяет и исправляет команда rebuildratings.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from api.cache import bump_model_version
+from reviews.models import Comment, Review
+
+BATCH_SIZE = 500
+
+
+def _find_drift():
+    """
+    Возвращает словарь {id отзыва: ожидаемое количество комментариев}
+    для отзывов, хранимое количество которых расходится с комментариями.
+    """
+    counts = dict(
+        Comment.objects.order_by().values_list('review').annotate(
+            count=Count('id')
+        ).iterator()
+    )
+    stored = Review.objects.order_by().values_list('pk', 'comment_count')
+    return {
+        pk: counts.get(pk, 0)
+        for pk, comment_count in stored.iterator()
+        if comment_count != counts.get(pk, 0)
+    }
+
+
+class Command(BaseCommand):
+    help = 'Проверка и пересчёт хранимого количества комментариев отзывов'
+
+    def handle(self, *args, **options):
+        drift = _find_drift()
+        if options['check']:
+            if drift:
+                raise CommandError(
+                    'Количество комментариев расходится у отзывов: '
+                    + ', '.join(map(str, sorted(drift)))
+                )
+            self.stdout.write('Расхождений не найдено.')
+            return
+        with transaction.atomic():
+            Review.objects.bulk_update(
+                [Review(pk=pk, comment_count=count)
+                 for pk, count in drift.items()],
+                ('comment_count', ),
+                batch_size=BATCH_SIZE,
+            )
+        if drift:
+            bump_model_version(Review)
+        self.stdout.write(
+            'Количество комментариев пересчитано, исправлено отзывов: '
+            f'{len(drift)}.'
+        )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-c',
+            '--check',
+            action='store_true',
+            default=False,
+            help='Только проверить количество комментариев, не изменяя его'
+        )
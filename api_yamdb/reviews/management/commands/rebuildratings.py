@@ -0,0 +1,123 @@
+"""
+Модуль содержит команду проверки и пересчёта рейтингов произведений.
+Хранимые сумма, количество, гистограмма оценок и рейтинг вычисляются
+за один проход по отзывам с группировкой по (title, score),
+расходящиеся произведения обновляются пакетно через bulk_update.
+bulk_update не отправляет сигналы, поэтому после исправления версии
+Title и GenreTitle увеличиваются явно: закэшированные ответы и ETag
+с прежним рейтингом устаревают.
+"""
+from collections import Counter, defaultdict
+from math import isclose
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F
+
+from api.cache import bump_model_version
+from reviews.models import SCORES, GenreTitle, Review, Title, histogram_field
+
+BATCH_SIZE = 500
+RATING_FIELDS = ('score_sum', 'score_count', 'rating') + tuple(
+    histogram_field(score) for score in SCORES
+)
+
+
+def _same_value(stored, expected):
+    """Сравнивает хранимое и ожидаемое значение с учётом округления."""
+    if stored is None or expected is None:
+        return stored is expected
+    return isclose(stored, expected)
+
+
+def _collect_histograms():
+    """Возвращает гистограммы оценок всех произведений за один запрос."""
+    histograms = defaultdict(Counter)
+    rows = Review.objects.order_by().values_list('title', 'score').annotate(
+        count=Count('id')
+    )
+    for title_id, score, count in rows.iterator():
+        histograms[title_id][score] = count
+    return histograms
+
+
+def _expected_fields(histogram):
+    """Возвращает ожидаемые значения полей рейтинга по гистограмме."""
+    total = sum(score * count for score, count in histogram.items())
+    count = sum(histogram.values())
+    fields = {
+        'score_sum': total,
+        'score_count': count,
+        'rating': total / count if count else None,
+    }
+    fields.update(
+        (histogram_field(score), histogram[score]) for score in SCORES
+    )
+    return fields
+
+
+def _find_drift():
+    """
+    Возвращает словарь {id произведения: ожидаемые значения полей}
+    для произведений, хранимые данные которых расходятся с отзывами,
+    и множество id произведений с устаревшей копией рейтинга в жанрах.
+    """
+    histograms = _collect_histograms()
+    drift = {}
+    titles = Title.objects.order_by().values('pk', *RATING_FIELDS)
+    for title in titles.iterator():
+        expected = _expected_fields(histograms.get(title['pk'], Counter()))
+        if not all(_same_value(title[field], expected[field])
+                   for field in RATING_FIELDS):
+            drift[title['pk']] = expected
+    stale_links = set(GenreTitle.objects.exclude(
+        rating=F('title__rating')
+    ).exclude(
+        rating__isnull=True, title__rating__isnull=True
+    ).values_list('title_id', flat=True))
+    return drift, stale_links
+
+
+def _chunks(items, size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Command(BaseCommand):
+    help = 'Проверка и пересчёт хранимых рейтингов и гистограмм оценок'
+
+    def handle(self, *args, **options):
+        drift, stale_links = _find_drift()
+        if options['check']:
+            broken = sorted(set(drift) | stale_links)
+            if broken:
+                raise CommandError(
+                    'Рейтинг расходится с отзывами у произведений: '
+                    + ', '.join(map(str, broken))
+                )
+            self.stdout.write('Расхождений не найдено.')
+            return
+        with transaction.atomic():
+            Title.objects.bulk_update(
+                [Title(pk=pk, **fields) for pk, fields in drift.items()],
+                RATING_FIELDS,
+                batch_size=BATCH_SIZE,
+            )
+            for title_ids in _chunks(set(drift) | stale_links):
+                GenreTitle.objects.filter(title__in=title_ids).sync_rating()
+        if drift or stale_links:
+            bump_model_version(Title)
+            bump_model_version(GenreTitle)
+        self.stdout.write(
+            f'Рейтинги пересчитаны, исправлено произведений: {len(drift)}.'
+        )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-c',
+            '--check',
+            action='store_true',
+            default=False,
+            help='Только проверить рейтинги, не изменяя их'
+        )
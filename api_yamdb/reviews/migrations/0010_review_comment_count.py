@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:18
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_comment_counts(apps, schema_editor):
+    Comment = apps.get_model('reviews', 'Comment')
+    Review = apps.get_model('reviews', 'Review')
+    rows = Comment.objects.order_by().values_list('review').annotate(
+        count=Count('id')
+    )
+    for review_id, count in rows:
+        Review.objects.filter(pk=review_id).update(comment_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_recommendations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='количество комментариев'),
+        ),
+        migrations.RunPython(fill_comment_counts, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,12 @@
 """Модуль содержит описание моделей."""
+from collections import Counter, OrderedDict
+
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import (Avg, Count, F, FloatField, OuterRef, Subquery,
+                              Sum, Value)
+from django.db.models.functions import Cast, Coalesce, NullIf
 
 from .validators import validate_year
 
@@ -9,6 +14,13 @@ from .validators import validate_year
 MAX_SCORE = 'Максимальная оценка'
 MIN_SCORE = 'Минимальная оценка'
 
+SCORES = range(1, 11)
+
+
+def histogram_field(score):
+    """Имя поля Title, хранящего количество оценок score."""
+    return f'score_{score}'
+
 
 class User(AbstractUser):
     """
@@ -91,9 +103,76 @@ class Category(models.Model):
         return str(self.name)
 
 
+class TitleQuerySet(models.QuerySet):
+    """Набор запросов для произведений."""
+
+    def update_rating(self, added=(), removed=()):
+        """
+        Атомарно добавляет и убирает оценки одним запросом UPDATE:
+        сдвигает сумму, количество и гистограмму оценок,
+        пересчитывает рейтинг и помечает похожие произведения
+        устаревшими.
+        """
+        score_sum = F('score_sum') + sum(added) - sum(removed)
+        score_count = F('score_count') + len(added) - len(removed)
+        histogram = Counter(added)
+        histogram.subtract(removed)
+        updated = self.update(
+            score_sum=score_sum,
+            score_count=score_count,
+            rating=(Cast(score_sum, FloatField())
+                    / NullIf(score_count, Value(0))),
+            similar_stale=True,
+            **{
+                histogram_field(score): F(histogram_field(score)) + delta
+                for score, delta in histogram.items() if delta
+            }
+        )
+        GenreTitle.objects.filter(title__in=self.values('pk')).sync_rating()
+        return updated
+
+    def refresh_rating(self):
+        """
+        Пересчитывает сумму, количество, гистограмму оценок и рейтинг
+        по отзывам одним запросом UPDATE с коррелированными подзапросами.
+        """
+        reviews = (Review.objects.filter(title=OuterRef('pk'))
+                   .order_by().values('title'))
+
+        def count(reviews):
+            return Coalesce(
+                Subquery(reviews.annotate(value=Count('id')).values('value')),
+                0
+            )
+
+        updated = self.update(
+            score_sum=Coalesce(
+                Subquery(reviews.annotate(value=Sum('score')).values('value')),
+                0
+            ),
+            score_count=count(reviews),
+            rating=Subquery(
+                reviews.annotate(value=Avg('score')).values('value')
+            ),
+            **{
+                histogram_field(score): count(reviews.filter(score=score))
+                for score in SCORES
+            }
+        )
+        GenreTitle.objects.filter(title__in=self.values('pk')).sync_rating()
+        return updated
+
+
 class Title(models.Model):
-    """Модель произведений."""
-    name = models.TextField(verbose_name='Название произведения')
+    """
+    Модель произведений.
+    Сумма, количество, гистограмма оценок и рейтинг хранятся в самой
+    модели и поддерживаются сигналами модели Review.
+    Флаг similar_stale отмечает произведения, оценки которых изменились
+    после последнего расчёта похожих произведений.
+    """
+    name = models.TextField(verbose_name='Название произведения',
+                            db_index=True)
     year = models.IntegerField(verbose_name='Год выпуска',
                                db_index=True,
                                validators=(validate_year, ))
@@ -108,18 +187,81 @@ class Title(models.Model):
                                    through='GenreTitle',
                                    verbose_name='Жанр',
                                    related_name='titles')
+    score_sum = models.PositiveIntegerField(verbose_name='Сумма оценок',
+                                            default=0)
+    score_count = models.PositiveIntegerField(
+        verbose_name='Количество оценок',
+        default=0,
+        db_index=True
+    )
+    rating = models.FloatField(verbose_name='Рейтинг',
+                               null=True,
+                               blank=True,
+                               db_index=True)
+    score_1 = models.PositiveIntegerField(verbose_name='Оценок 1',
+                                          default=0)
+    score_2 = models.PositiveIntegerField(verbose_name='Оценок 2',
+                                          default=0)
+    score_3 = models.PositiveIntegerField(verbose_name='Оценок 3',
+                                          default=0)
+    score_4 = models.PositiveIntegerField(verbose_name='Оценок 4',
+                                          default=0)
+    score_5 = models.PositiveIntegerField(verbose_name='Оценок 5',
+                                          default=0)
+    score_6 = models.PositiveIntegerField(verbose_name='Оценок 6',
+                                          default=0)
+    score_7 = models.PositiveIntegerField(verbose_name='Оценок 7',
+                                          default=0)
+    score_8 = models.PositiveIntegerField(verbose_name='Оценок 8',
+                                          default=0)
+    score_9 = models.PositiveIntegerField(verbose_name='Оценок 9',
+                                          default=0)
+    score_10 = models.PositiveIntegerField(verbose_name='Оценок 10',
+                                           default=0)
+    similar_stale = models.BooleanField(
+        verbose_name='Похожие произведения устарели',
+        default=True
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
         ordering = ['category', 'name', '-year']
+        indexes = (
+            models.Index(fields=('category', 'rating', 'id'),
+                         name='title_category_rating_idx'),
+        )
 
     def __str__(self):
         return str(self.name)
 
+    @property
+    def histogram(self):
+        """Количество оценок от 1 до 10."""
+        return OrderedDict(
+            (str(score), getattr(self, histogram_field(score)))
+            for score in SCORES
+        )
+
+
+class GenreTitleQuerySet(models.QuerySet):
+    """Набор запросов для связей произведений с жанрами."""
+
+    def sync_rating(self):
+        """Копирует в связи текущий рейтинг их произведений."""
+        return self.update(rating=Subquery(
+            Title.objects.filter(pk=OuterRef('title_id')).values('rating')
+        ))
+
 
 class GenreTitle(models.Model):
-    """Модель связи произведения с жанром."""
+    """
+    Модель связи произведения с жанром.
+    Хранит копию рейтинга произведения, чтобы лучшие произведения жанра
+    выбирались по индексу без обращения к отзывам.
+    """
     title = models.ForeignKey(
         Title,
         on_delete=models.CASCADE,
@@ -128,10 +270,44 @@ class GenreTitle(models.Model):
         Genre,
         on_delete=models.CASCADE,
     )
+    rating = models.FloatField(verbose_name='Рейтинг произведения',
+                               null=True,
+                               blank=True)
+
+    objects = GenreTitleQuerySet.as_manager()
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('genre', 'rating', 'title'),
+                         name='genretitle_genre_rating_idx'),
+        )
+
+
+class ReviewQuerySet(models.QuerySet):
+    """Набор запросов для отзывов."""
+
+    def shift_comment_count(self, delta):
+        """Атомарно сдвигает количество комментариев одним UPDATE."""
+        return self.update(comment_count=F('comment_count') + delta)
+
+    def refresh_comment_count(self):
+        """Пересчитывает количество комментариев коррелированным запросом."""
+        return self.update(comment_count=Coalesce(
+            Subquery(
+                Comment.objects.filter(review=OuterRef('pk')).order_by()
+                .values('review').annotate(value=Count('id')).values('value')
+            ),
+            0
+        ))
 
 
 class Review(models.Model):
-    """Модель отзывов."""
+    """
+    Модель отзывов.
+    Хранит количество комментариев, чтобы списки отзывов выводили его
+    без подсчёта по таблице комментариев. Количество сдвигается
+    обработчиками сигналов комментариев (см. signals.py).
+    """
     text = models.TextField()
     pub_date = models.DateTimeField(
         'Дата публикации',
@@ -146,8 +322,8 @@ class Review(models.Model):
     score = models.IntegerField(
         'оценка',
         validators=(
-            MinValueValidator(1, 'Минимальная оценка-1'),
-            MaxValueValidator(10, 'Максимальная оценка-10')
+            MinValueValidator(SCORES[0], 'Минимальная оценка-1'),
+            MaxValueValidator(SCORES[-1], 'Максимальная оценка-10')
         )
     )
     title = models.ForeignKey(
@@ -156,6 +332,12 @@ class Review(models.Model):
         related_name='reviews',
         verbose_name='произведение'
     )
+    comment_count = models.PositiveIntegerField(
+        'количество комментариев',
+        default=0
+    )
+
+    objects = ReviewQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Отзыв'
@@ -165,7 +347,12 @@ class Review(models.Model):
                 fields=['title', 'author'],
                 name='unique_riview'),
         )
-        ordering = ['-pub_date', 'title', '-score', 'text']
+        # списки отзывов произведения читаются по индексу без сортировки
+        ordering = ['-pub_date', '-id']
+        indexes = (
+            models.Index(fields=('title', '-pub_date', '-id'),
+                         name='review_title_pub_date_idx'),
+        )
 
     def __str__(self):
         return f'{str(self.author)}: {str(self.score)} | {str(self.title)}'
@@ -193,7 +380,77 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
-        ordering = ['-pub_date', 'review', 'text']
+        # списки комментариев отзыва читаются по индексу без сортировки
+        ordering = ['-pub_date', '-id']
+        indexes = (
+            models.Index(fields=('review', '-pub_date', '-id'),
+                         name='comment_review_pub_date_idx'),
+        )
 
     def __str__(self):
         return str(self.text)
+
+
+class SimilarTitle(models.Model):
+    """
+    Модель похожего произведения.
+    Заполняется командой buildsimilar: для каждого произведения хранятся
+    произведения с наибольшим косинусным сходством оценок пользователей.
+    """
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='similar_titles',
+        verbose_name='произведение'
+    )
+    similar = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='похожее произведение'
+    )
+    score = models.FloatField('Сходство')
+
+    class Meta:
+        verbose_name = 'Похожее произведение'
+        verbose_name_plural = 'Похожие произведения'
+        indexes = (
+            models.Index(fields=('title', '-score'),
+                         name='similartitle_title_score_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.title_id} -> {self.similar_id}: {self.score:.3f}'
+
+
+class Recommendation(models.Model):
+    """
+    Модель рекомендации произведения пользователю.
+    Заполняется командой buildrecommendations: для каждого пользователя
+    хранятся произведения без его отзыва с наибольшей оценкой,
+    предсказанной матричным разложением.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='пользователь'
+    )
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='произведение'
+    )
+    score = models.FloatField('Предсказанная оценка')
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        indexes = (
+            models.Index(fields=('user', '-score'),
+                         name='recommendation_user_score_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.title_id}: {self.score:.2f}'
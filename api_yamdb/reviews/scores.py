@@ -0,0 +1,59 @@
+"""
+Модуль содержит общие функции пакетных расчётов по оценкам отзывов:
+чтение оценок порциями в массивы NumPy и выбор top-K, в том числе
+внутри групп строк.
+"""
+from itertools import islice
+
+import numpy as np
+
+from .models import Review
+
+READ_CHUNK = 100000
+BATCH_SIZE = 500
+
+
+def chunks(items, size=BATCH_SIZE):
+    """Делит последовательность на части длиной size."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def load_scores(chunk_size=READ_CHUNK):
+    """
+    Читает оценки из отзывов порциями.
+    Возвращает массивы id авторов, id произведений и оценок.
+    """
+    rows = Review.objects.order_by().values_list(
+        'author_id', 'title_id', 'score'
+    ).iterator(chunk_size=chunk_size)
+    parts = [np.empty((0, 3), dtype=np.int64)]
+    while True:
+        part = list(islice(rows, chunk_size))
+        if not part:
+            break
+        parts.append(np.array(part, dtype=np.int64))
+    data = np.concatenate(parts)
+    return data[:, 0], data[:, 1], data[:, 2]
+
+
+def top_k(indices, values, k):
+    """Возвращает k наибольших значений по убыванию и их индексы."""
+    if len(values) > k:
+        part = np.argpartition(-values, k)[:k]
+        indices, values = indices[part], values[part]
+    order = np.lexsort((indices, -values))
+    return indices[order], values[order]
+
+
+def top_k_per_group(groups, values, k):
+    """
+    Возвращает номера строк с k наибольшими значениями в каждой группе,
+    упорядоченные по группе и по убыванию значения.
+    """
+    order = np.lexsort((-values, groups))
+    groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    sizes = np.diff(np.r_[starts, len(groups)])
+    ranks = np.arange(len(groups)) - np.repeat(starts, sizes)
+    return order[ranks < k]
@@ -0,0 +1,109 @@
+"""
+Модуль содержит полнотекстовый поиск по произведениям.
+В SQLite используется теневая таблица FTS5 по полям name и description,
+которая синхронизируется с reviews_title триггерами.
+SQLite пересоздаёт таблицу при миграциях, изменяющих схему, и триггеры
+при этом теряются, поэтому индекс проверяется после каждой миграции.
+Для других СУБД поиск выполняется по частичному совпадению.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+SEARCH_TABLE = 'reviews_title_fts'
+
+CREATE_TABLE = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} '
+    f'USING fts5(name, description, content=reviews_title, content_rowid=id)'
+)
+
+INSERT_ROW = (
+    f'INSERT INTO {SEARCH_TABLE}(rowid, name, description) '
+    f'VALUES (new.id, new.name, new.description); '
+)
+
+DELETE_ROW = (
+    f'INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, description) '
+    f"VALUES ('delete', old.id, old.name, old.description); "
+)
+
+TRIGGERS = {
+    f'{SEARCH_TABLE}_insert': (
+        f'CREATE TRIGGER {SEARCH_TABLE}_insert AFTER INSERT ON reviews_title '
+        f'BEGIN {INSERT_ROW} END'
+    ),
+    f'{SEARCH_TABLE}_delete': (
+        f'CREATE TRIGGER {SEARCH_TABLE}_delete AFTER DELETE ON reviews_title '
+        f'BEGIN {DELETE_ROW} END'
+    ),
+    f'{SEARCH_TABLE}_update': (
+        f'CREATE TRIGGER {SEARCH_TABLE}_update '
+        f'AFTER UPDATE OF name, description ON reviews_title '
+        f'BEGIN {DELETE_ROW}{INSERT_ROW} END'
+    ),
+}
+
+REBUILD = f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"
+
+WORD_RE = re.compile(r'\w+')
+
+
+def supports_full_text_search(connection):
+    return connection.vendor == 'sqlite'
+
+
+def ensure_title_search_index(using='default'):
+    """
+    Создаёт таблицу FTS5 и недостающие триггеры.
+    Если триггеров не было, индекс перестраивается по reviews_title.
+    """
+    connection = connections[using]
+    if not supports_full_text_search(connection):
+        return
+    with connection.cursor() as cursor:
+        if 'reviews_title' not in connection.introspection.table_names(cursor):
+            return
+        cursor.execute(CREATE_TABLE)
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(TRIGGERS[name])
+        if missing:
+            cursor.execute(REBUILD)
+
+
+def _match_expression(words):
+    """
+    Преобразует слова из ввода в запрос FTS5: каждое слово
+    ищется по префиксу, все слова должны присутствовать.
+    Служебный синтаксис FTS5 из ввода не попадает в запрос.
+    """
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_titles(queryset, text):
+    """
+    Фильтрует произведения по словам из name и description.
+    В SQLite результаты упорядочены по релевантности (bm25).
+    """
+    words = WORD_RE.findall(text)
+    if not words:
+        return queryset.none()
+    if not supports_full_text_search(connections[queryset.db]):
+        condition = Q()
+        for word in words:
+            condition &= (Q(name__icontains=word)
+                          | Q(description__icontains=word))
+        return queryset.filter(condition)
+    return queryset.extra(
+        tables=[SEARCH_TABLE],
+        where=[f'{SEARCH_TABLE} MATCH %s',
+               f'{SEARCH_TABLE}.rowid = reviews_title.id'],
+        params=[_match_expression(words)],
+        select={'search_rank': f'{SEARCH_TABLE}.rank'},
+        order_by=['search_rank'],
+    )
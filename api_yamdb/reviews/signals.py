@@ -0,0 +1,115 @@
+"""Модуль содержит обработчики сигналов моделей."""
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save, pre_save)
+from django.dispatch import receiver
+
+from .models import Comment, GenreTitle, Review, Title
+
+
+def _remember_review_state(review):
+    """
+    Запоминает сохранённые в БД оценку и произведение отзыва.
+    Отложенные поля не читаются, чтобы не делать лишних запросов.
+    """
+    review._stored_score = review.__dict__.get('score')
+    review._stored_title_id = review.__dict__.get('title_id')
+
+
+@receiver(post_init, sender=Review)
+def review_loaded(sender, instance, **kwargs):
+    _remember_review_state(instance)
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    """
+    Сдвигает хранимый рейтинг и гистограмму оценок произведения
+    после сохранения отзыва.
+    """
+    titles = Title.objects.filter(pk=instance.title_id)
+    if created:
+        titles.update_rating(added=(instance.score, ))
+    elif instance._stored_score is None:
+        titles.refresh_rating()
+    elif instance._stored_title_id == instance.title_id:
+        if instance.score != instance._stored_score:
+            titles.update_rating(added=(instance.score, ),
+                                 removed=(instance._stored_score, ))
+    else:
+        Title.objects.filter(pk=instance._stored_title_id).update_rating(
+            removed=(instance._stored_score, )
+        )
+        titles.update_rating(added=(instance.score, ))
+    _remember_review_state(instance)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """
+    Убирает оценку удалённого отзыва из рейтинга и гистограммы
+    произведения.
+    Срабатывает и при каскадном удалении отзывов.
+    """
+    Title.objects.filter(pk=instance._stored_title_id).update_rating(
+        removed=(instance._stored_score, )
+    )
+
+
+def _remember_comment_review(comment):
+    """Запоминает сохранённый в БД отзыв комментария."""
+    comment._stored_review_id = comment.__dict__.get('review_id')
+
+
+@receiver(post_init, sender=Comment)
+def comment_loaded(sender, instance, **kwargs):
+    _remember_comment_review(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    """
+    Сдвигает хранимое количество комментариев отзыва после сохранения
+    комментария.
+    """
+    reviews = Review.objects.filter(pk=instance.review_id)
+    if created:
+        reviews.shift_comment_count(1)
+    elif instance._stored_review_id is None:
+        reviews.refresh_comment_count()
+    elif instance._stored_review_id != instance.review_id:
+        Review.objects.filter(
+            pk=instance._stored_review_id
+        ).shift_comment_count(-1)
+        reviews.shift_comment_count(1)
+    _remember_comment_review(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """
+    Уменьшает количество комментариев отзыва после удаления комментария.
+    Срабатывает и при каскадном удалении комментариев.
+    """
+    Review.objects.filter(
+        pk=instance._stored_review_id
+    ).shift_comment_count(-1)
+
+
+@receiver(pre_save, sender=GenreTitle)
+def genre_title_saving(sender, instance, **kwargs):
+    """Копирует рейтинг произведения в сохраняемую связь с жанром."""
+    instance.rating = Title.objects.filter(
+        pk=instance.title_id
+    ).values_list('rating', flat=True).first()
+
+
+@receiver(m2m_changed, sender=GenreTitle)
+def genre_titles_added(sender, instance, action, reverse, pk_set, **kwargs):
+    """Копирует рейтинг произведения в связи, созданные через add/set."""
+    if action != 'post_add':
+        return
+    if reverse:
+        links = GenreTitle.objects.filter(genre=instance, title__in=pk_set)
+    else:
+        links = GenreTitle.objects.filter(title=instance, genre__in=pk_set)
+    links.sync_rating()
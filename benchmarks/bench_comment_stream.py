@@ -0,0 +1,141 @@
+"""
+Поток новых комментариев: множество наблюдателей одного отзыва.
+ASGI-приложение проекта вызывается напрямую, без сервера и сети:
+наблюдатели подключаются к потоку, затем комментарии сохраняются
+в отдельном потоке, как при запросах через WSGI-часть приложения.
+Измеряются время подключения, запросы к БД во время ожидания
+и задержка доставки комментария всем наблюдателям.
+Запуск из корня репозитория:
+    python benchmarks/bench_comment_stream.py --watchers 1000
+"""
+import argparse
+import asyncio
+import resource
+import statistics
+import time
+
+from common import setup_django
+
+
+class Watcher:
+    """Наблюдатель: держит соединение и запоминает время событий."""
+
+    def __init__(self, application, path):
+        self.inbox = asyncio.Queue()
+        self.received = {}
+        self.status = None
+        scope = {'type': 'http', 'method': 'GET', 'path': path,
+                 'query_string': b'', 'headers': []}
+        self.task = asyncio.ensure_future(
+            application(scope, self.inbox.get, self.send)
+        )
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+            return
+        body = message.get('body', b'')
+        if body.startswith(b'id: '):
+            comment_id = int(body[4:body.index(b'\n')])
+            self.received[comment_id] = time.perf_counter()
+
+    async def close(self):
+        self.inbox.put_nowait({'type': 'http.disconnect'})
+        await self.task
+
+
+class QueryCounter:
+    """Считает запросы к БД во всех потоках."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self):
+        from django.db import connection
+        from django.db.backends.signals import connection_created
+        connection.execute_wrappers.append(self)
+        connection_created.connect(self.connection_created, weak=False)
+
+    def connection_created(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self)
+
+
+async def run(args, review, author, counter):
+    from api.streams import CommentStream, broker
+    from api_yamdb.asgi import Application, WsgiToAsgi, wsgi_application
+    from reviews.models import Comment
+    application = Application(CommentStream(), WsgiToAsgi(wsgi_application))
+    path = (f'/api/v1/titles/{review.title_id}/reviews/{review.pk}'
+            f'/comments/stream/')
+    loop = asyncio.get_running_loop()
+
+    start = time.perf_counter()
+    queries = counter.count
+    watchers = [Watcher(application, path) for _ in range(args.watchers)]
+    while broker.watchers(review.pk) < args.watchers or any(
+        watcher.status is None for watcher in watchers
+    ):
+        await asyncio.sleep(0.01)
+    print(f'Подключение {args.watchers} наблюдателей: '
+          f'{time.perf_counter() - start:.2f} с, '
+          f'запросов к БД: {counter.count - queries}')
+
+    queries = counter.count
+    await asyncio.sleep(args.idle)
+    print(f'Ожидание {args.idle:.1f} с: запросов к БД '
+          f'{counter.count - queries}')
+
+    latencies = []
+    queries = counter.count
+    for number in range(args.comments):
+        saved = time.perf_counter()
+        comment = await loop.run_in_executor(None, lambda: (
+            Comment.objects.create(review=review, author=author,
+                                   text=f'Комментарий {number}')
+        ))
+        while not all(comment.pk in watcher.received
+                      for watcher in watchers):
+            await asyncio.sleep(0.001)
+        latencies.extend(watcher.received[comment.pk] - saved
+                         for watcher in watchers)
+    latencies.sort()
+    print(f'Комментариев: {args.comments}, запросов к БД: '
+          f'{counter.count - queries}')
+    print(f'Задержка доставки, мс: медиана '
+          f'{statistics.median(latencies) * 1000:.1f}, '
+          f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f}, '
+          f'максимум {latencies[-1] * 1000:.1f}')
+    for watcher in watchers:
+        await watcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--watchers', type=int, default=1000)
+    parser.add_argument('--comments', type=int, default=20)
+    parser.add_argument('--idle', type=float, default=2.0)
+    args = parser.parse_args()
+
+    setup_django()
+    from reviews.models import Category, Review, Title, User
+
+    category = Category.objects.create(name='Категория', slug='category')
+    title = Title.objects.create(name='Произведение', year=2000,
+                                 category=category)
+    author = User.objects.create(username='author', email='a@yamdb.local')
+    review = Review.objects.create(title=title, author=author, text='.',
+                                   score=5)
+    counter = QueryCounter()
+    counter.install()
+    asyncio.run(run(args, review, author, counter))
+    print(f'Пиковая память процесса: '
+          f'{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}'
+          f' МБ')
+
+
+if __name__ == '__main__':
+    main()
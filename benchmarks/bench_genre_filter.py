@@ -0,0 +1,55 @@
+"""
+Сравнение фильтра по нескольким жанрам: JOIN (с DISTINCT для "любой")
+и подзапросы `id IN (...)` из TitleFilter.
+Запуск из корня репозитория:
+    python benchmarks/bench_genre_filter.py --titles 200000
+"""
+import argparse
+
+from common import best_time, create_catalog, setup_django
+
+
+def join_filter(queryset, slugs, mode):
+    if mode == 'all':
+        for slug in slugs:
+            queryset = queryset.filter(genre__slug=slug)
+        return queryset
+    return queryset.filter(genre__slug__in=slugs).distinct()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from api.filters import TitleFilter
+    from reviews.models import Title
+
+    create_catalog(args.titles, genres=20)
+    print(f'Произведений: {args.titles}, жанров: 20')
+    print(f'{"жанров":<8}{"режим":<6}{"найдено":>10}{"JOIN, мс":>12}'
+          f'{"IN, мс":>12}')
+    for count in (1, 3, 5):
+        slugs = [f'genre-{i}' for i in range(count)]
+        for mode in ('any', 'all'):
+            joined = join_filter(Title.objects.order_by(), slugs, mode)
+            semijoin = TitleFilter(
+                data={'genre': ','.join(slugs), 'genre_mode': mode},
+                queryset=Title.objects.order_by(),
+            ).qs
+
+            def run(queryset):
+                return lambda: (queryset.count(), list(queryset[:10]))
+
+            found = semijoin.count()
+            assert found == joined.count()
+            join_time = best_time(run(joined), args.repeat) * 1000
+            semijoin_time = best_time(run(semijoin), args.repeat) * 1000
+            print(f'{count:<8}{mode:<6}{found:>10}{join_time:>12.1f}'
+                  f'{semijoin_time:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
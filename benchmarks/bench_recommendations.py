@@ -0,0 +1,42 @@
+"""
+Расчёт рекомендаций командой buildrecommendations с разным числом
+процессов. Команда сама выводит время итераций и скорость записи.
+Запуск из корня репозитория:
+    python benchmarks/bench_recommendations.py --users 50000 --workers 1 4
+"""
+import argparse
+import time
+from io import StringIO
+
+from common import create_catalog, create_scores, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--reviews-per-user', type=int, default=20)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from reviews.models import Review
+
+    create_catalog(args.titles)
+    create_scores(args.users, args.reviews_per_user)
+    print(f'Произведений: {args.titles}, пользователей: {args.users}, '
+          f'отзывов: {Review.objects.count()}')
+    for workers in args.workers:
+        out = StringIO()
+        start = time.perf_counter()
+        call_command('buildrecommendations', workers=workers,
+                     iterations=args.iterations, stdout=out)
+        elapsed = time.perf_counter() - start
+        print(f'--- процессов: {workers}, всего {elapsed:.1f} с')
+        print(out.getvalue().strip())
+
+
+if __name__ == '__main__':
+    main()
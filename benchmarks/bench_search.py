@@ -0,0 +1,48 @@
+"""
+Сравнение полнотекстового поиска FTS5 с фильтром name__contains.
+Запуск из корня репозитория:
+    python benchmarks/bench_search.py --titles 1000000
+"""
+import argparse
+
+from common import best_time, create_catalog, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from reviews.models import Title
+    from reviews.search import search_titles
+
+    vocabulary = create_catalog(args.titles)
+    queries = (vocabulary[0], vocabulary[len(vocabulary) // 2],
+               vocabulary[-1][:4])
+    print(f'Произведений: {args.titles}')
+    print('contains ищет только по названию, fts5 - по названию и описанию')
+    print(f'{"запрос":<12}{"contains":>10}{"fts5":>8}{"contains, мс":>16}'
+          f'{"fts5, мс":>12}{"ускорение":>12}')
+    for query in queries:
+        contains = Title.objects.filter(name__contains=query).order_by()
+        search = search_titles(Title.objects.all(), query)
+
+        def run_contains():
+            contains.count()
+            list(contains[:10])
+
+        def run_search():
+            search.count()
+            list(search[:10])
+
+        contains_time = best_time(run_contains, args.repeat) * 1000
+        search_time = best_time(run_search, args.repeat) * 1000
+        print(f'{query:<12}{contains.count():>10}{search.count():>8}'
+              f'{contains_time:>16.1f}{search_time:>12.1f}'
+              f'{contains_time / search_time:>11.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Расчёт похожих произведений командой buildsimilar: полный пересчёт
+и инкрементальный после изменения оценок части произведений.
+Для инкрементального пересчёта измеряется пик памяти, выделенной
+за время пересчёта (tracemalloc учитывает и массивы NumPy).
+Запуск из корня репозитория:
+    python benchmarks/bench_similar.py --titles 20000 --users 50000
+Большая доля устаревших произведений:
+    python benchmarks/bench_similar.py --stale-share 0.5
+"""
+import argparse
+import resource
+import time
+import tracemalloc
+from io import StringIO
+
+from common import create_catalog, create_scores, setup_django
+
+
+def run(command_options):
+    from django.core.management import call_command
+    out = StringIO()
+    start = time.perf_counter()
+    call_command('buildsimilar', stdout=out, **command_options)
+    return time.perf_counter() - start, out.getvalue().strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--reviews-per-user', type=int, default=20)
+    parser.add_argument('--stale-share', type=float, default=0.01)
+    parser.add_argument('--block-size', type=int, default=256)
+    args = parser.parse_args()
+
+    setup_django()
+    from reviews.models import Review, SimilarTitle, Title
+
+    create_catalog(args.titles)
+    create_scores(args.users, args.reviews_per_user)
+    print(f'Произведений: {args.titles}, пользователей: {args.users}, '
+          f'отзывов: {Review.objects.count()}')
+
+    elapsed, report = run({'full': True, 'block_size': args.block_size})
+    print(report)
+    print(f'Полный пересчёт: {elapsed:.1f} с, '
+          f'строк похожих: {SimilarTitle.objects.count()}')
+
+    stale = int(args.titles * args.stale_share)
+    Title.objects.filter(
+        pk__in=Title.objects.order_by('?').values('pk')[:stale]
+    ).update(similar_stale=True)
+    tracemalloc.start()
+    elapsed, report = run({'block_size': args.block_size})
+    allocated = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    print(report)
+    print(f'Инкрементальный пересчёт ({stale} произведений): '
+          f'{elapsed:.1f} с, пик выделенной памяти: {allocated:.0f} МБ')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'Пиковая память процесса: {peak:.0f} МБ')
+
+
+if __name__ == '__main__':
+    main()
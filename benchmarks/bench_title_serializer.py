@@ -0,0 +1,43 @@
+"""
+Сравнение ReadTitleSerializer и ReadTitleValuesSerializer (строк в секунду).
+Запуск из корня репозитория:
+    python benchmarks/bench_title_serializer.py --titles 10000
+"""
+import argparse
+
+from common import best_time, create_catalog, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=10000)
+    parser.add_argument('--page', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from api.serializers import ReadTitleSerializer, ReadTitleValuesSerializer
+    from reviews.models import Title
+
+    create_catalog(args.titles)
+    queryset = (Title.objects.select_related('category')
+                .prefetch_related('genre').order_by('pk'))[:args.page]
+    values = ReadTitleValuesSerializer.prepare_queryset(
+        Title.objects.order_by('pk')
+    )[:args.page]
+
+    def run_model():
+        return ReadTitleSerializer(queryset.all(), many=True).data
+
+    def run_values():
+        return ReadTitleValuesSerializer(values.all(), many=True).data
+
+    print(f'Произведений: {args.titles}, строк на странице: {args.page}')
+    for label, func in (('ReadTitleSerializer', run_model),
+                        ('ReadTitleValuesSerializer', run_values)):
+        seconds = best_time(func, args.repeat)
+        print(f'{label:<28}{args.page / seconds:>12.0f} строк/с')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Общая подготовка окружения для бенчмарков.
+Бенчмарки работают с тестовой БД Django (для SQLite - в памяти),
+рабочая база проекта не затрагивается.
+"""
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / 'api_yamdb'
+
+
+def setup_django():
+    """Настраивает Django и создаёт тестовую БД со всеми миграциями."""
+    sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+    import django
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def make_vocabulary(size, seed=0):
+    """Возвращает список псевдослов заданного размера."""
+    rng = random.Random(seed)
+    letters = 'абвгдежзиклмнопрстуфхцчшэюя'
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(letters)
+                          for _ in range(rng.randint(4, 9))))
+    return sorted(words)
+
+
+def best_time(func, repeat=5):
+    """Лучшее время выполнения func за repeat запусков, в секундах."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def create_catalog(titles, genres=20, categories=5, batch=10000, seed=0,
+                   vocabulary=None):
+    """
+    Заполняет БД произведениями со случайными названиями и описаниями.
+    Каждое произведение получает от одного до трёх жанров.
+    """
+    from reviews.models import Category, Genre, GenreTitle, Title
+    rng = random.Random(seed)
+    vocabulary = vocabulary or make_vocabulary(5000, seed)
+    Category.objects.bulk_create(
+        Category(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(categories)
+    )
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(genres)
+    )
+    category_ids = list(Category.objects.values_list('pk', flat=True))
+    genre_ids = list(Genre.objects.values_list('pk', flat=True))
+    for start in range(0, titles, batch):
+        size = min(batch, titles - start)
+        Title.objects.bulk_create(
+            Title(name=' '.join(rng.choices(vocabulary, k=3)),
+                  description=' '.join(rng.choices(vocabulary, k=20)),
+                  year=rng.randint(1900, 2020),
+                  category_id=rng.choice(category_ids))
+            for _ in range(size)
+        )
+    title_ids = Title.objects.values_list('pk', flat=True).iterator()
+    links = []
+    for title_id in title_ids:
+        for genre_id in rng.sample(genre_ids, rng.randint(1, 3)):
+            links.append(GenreTitle(title_id=title_id, genre_id=genre_id))
+        if len(links) >= batch:
+            GenreTitle.objects.bulk_create(links)
+            links = []
+    GenreTitle.objects.bulk_create(links)
+    return vocabulary
+
+
+def create_scores(users, reviews_per_user, batch=10000, seed=0):
+    """
+    Создаёт пользователей и их отзывы на уже созданные произведения.
+    Популярность произведений неравномерна: часть произведений
+    получает заметно больше оценок, чем остальные.
+    Сигналы моделей не вызываются, хранимые рейтинги не обновляются.
+    """
+    from reviews.models import Review, Title, User
+    rng = random.Random(seed)
+    User.objects.bulk_create(
+        User(username=f'user-{i}', email=f'user-{i}@yamdb.local')
+        for i in range(users)
+    )
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    title_ids = list(Title.objects.values_list('pk', flat=True))
+    weights = [1 / (rank + 10) for rank in range(len(title_ids))]
+    reviews = []
+    for user_id in user_ids:
+        chosen = set(rng.choices(title_ids, weights, k=reviews_per_user))
+        reviews.extend(
+            Review(author_id=user_id, title_id=title_id, text='.',
+                   score=rng.randint(1, 10))
+            for title_id in chosen
+        )
+        if len(reviews) >= batch:
+            Review.objects.bulk_create(reviews)
+            reviews = []
+    Review.objects.bulk_create(reviews)
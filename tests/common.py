@@ -113,3 +113,41 @@ def create_comments(admin_client, admin):
     result.append({'id': create_comment(client_moderator, titles[0]["id"], reviews[0]["id"], 'qwerty321'),
                    'author': moderator.username, 'text': 'qwerty321'})
     return result, reviews, titles, user, moderator
+
+
+def create_titles_bulk(count, genres_per_title=2):
+    """Быстро создаёт `count` произведений с жанрами напрямую через ORM."""
+    from reviews.models import Category, Genre, GenreTitle, Title
+    category = Category.objects.create(name='Массовая', slug='bulk')
+    genres = [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'bulk-{i}')
+        for i in range(genres_per_title)
+    ]
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {i}', year=2000, category=category)
+        for i in range(count)
+    )
+    titles = list(Title.objects.filter(category=category).order_by('pk'))
+    GenreTitle.objects.bulk_create(
+        GenreTitle(title=title, genre=genre)
+        for title in titles for genre in genres
+    )
+    return titles
+
+
+def explain_query_plan(sql):
+    """Возвращает строки EXPLAIN QUERY PLAN для SQL запроса (SQLite)."""
+    from django.db import connection
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def captured_select(queries, table):
+    """Находит в перехваченных запросах выборку из таблицы `table`."""
+    prefix = 'SELECT'
+    for query in queries:
+        sql = query['sql']
+        if sql.startswith(prefix) and f'FROM "{table}"' in sql:
+            return sql
+    raise AssertionError(f'Не найден запрос к таблице {table}')
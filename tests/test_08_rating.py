@@ -0,0 +1,85 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from .common import create_reviews
+
+
+class Test08StoredRating:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_rating_follows_reviews(self, admin_client, admin):
+        from reviews.models import Title
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.score_count) == (12, 3), (
+            'Проверьте, что при создании отзыва обновляются `score_sum` и `score_count` произведения'
+        )
+        assert title.rating == 4, (
+            'Проверьте, что при создании отзыва обновляется хранимый `rating` произведения'
+        )
+        admin_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/', data={'score': 8}
+        )
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count) == (15, 3), (
+            'Проверьте, что при изменении оценки отзыва обновляется хранимый рейтинг произведения'
+        )
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/')
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count, title.rating) == (7, 2, 3.5), (
+            'Проверьте, что при удалении отзыва обновляется хранимый рейтинг произведения'
+        )
+        user.delete()
+        moderator.delete()
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count, title.rating) == (0, 0, None), (
+            'Проверьте, что при каскадном удалении отзывов обновляется хранимый рейтинг произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_rebuild_command(self, admin_client, admin):
+        from reviews.models import Title
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        call_command('rebuildratings', check=True)
+        Title.objects.update(score_sum=0, score_count=0, rating=None)
+        with pytest.raises(CommandError):
+            call_command('rebuildratings', check=True)
+        call_command('rebuildratings')
+        call_command('rebuildratings', check=True)
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.score_count, title.rating) == (12, 3, 4), (
+            'Проверьте, что команда `rebuildratings` пересчитывает хранимый рейтинг'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_rating_fields_are_not_filters(self, client, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        total = client.get('/api/v1/titles/').json()['count']
+        for param in ('score_sum=0', 'score_count=0', 'rating=4', 'score_3=0', 'similar_stale=true'):
+            response = client.get(f'/api/v1/titles/?{param}')
+            assert response.status_code == 200
+            assert response.json()['count'] == total, (
+                f'Проверьте, что служебное поле произведения `{param}` не является фильтром'
+            )
+        assert client.get('/api/v1/titles/?description=').json()['count'] == total
+        assert client.get(f'/api/v1/titles/?id={titles[0]["id"]}').json()['count'] == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_rebuild_command_invalidates_cache(self, client, admin_client, admin):
+        from reviews.models import GenreTitle, Title
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        Title.objects.update(score_sum=0, score_count=0, rating=None)
+        GenreTitle.objects.update(rating=None)
+        response = client.get(url)
+        etag = response['ETag']
+        assert response.json()['rating'] is None
+        assert client.get(url)['X-Cache'] == 'HIT'
+        call_command('rebuildratings')
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS' and response.json()['rating'] == 4, (
+            'Проверьте, что после команды `rebuildratings` кэш не отдаёт прежний рейтинг'
+        )
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200, (
+            'Проверьте, что после команды `rebuildratings` `ETag` произведения меняется'
+        )
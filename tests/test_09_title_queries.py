@@ -0,0 +1,35 @@
+import pytest
+
+from .common import create_titles_bulk
+
+TITLE_LIST_BUDGET = 3
+TITLE_DETAIL_BUDGET = 2
+
+
+class Test09TitleQueryBudget:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('limit', (10, 100, 1000))
+    def test_01_title_list_budget(self, client, django_assert_max_num_queries, limit):
+        create_titles_bulk(limit)
+        with django_assert_max_num_queries(TITLE_LIST_BUDGET):
+            response = client.get(f'/api/v1/titles/?limit={limit}')
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert len(results) == limit, (
+            'Проверьте, что GET запрос `/api/v1/titles/` возвращает всю страницу'
+        )
+        assert all(len(title['genre']) == 2 and title['category'] for title in results), (
+            'Проверьте, что GET запрос `/api/v1/titles/` возвращает жанры и категорию произведений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('limit', (10, 100, 1000))
+    def test_02_title_detail_budget(self, client, django_assert_max_num_queries, limit):
+        titles = create_titles_bulk(limit)
+        with django_assert_max_num_queries(TITLE_DETAIL_BUDGET):
+            response = client.get(f'/api/v1/titles/{titles[-1].pk}/')
+        assert response.status_code == 200
+        assert len(response.json()['genre']) == 2, (
+            'Проверьте, что GET запрос `/api/v1/titles/{title_id}/` возвращает жанры произведения'
+        )
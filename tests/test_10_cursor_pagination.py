@@ -0,0 +1,52 @@
+import pytest
+
+from .common import create_reviews, create_titles_bulk
+
+
+def collect_pages(client, url):
+    results = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200, (
+            f'Проверьте, что GET запрос `{url}` в режиме курсора возвращает статус 200'
+        )
+        data = response.json()
+        assert 'count' not in data, (
+            'Проверьте, что в режиме курсора не выполняется подсчёт записей'
+        )
+        results.extend(data['results'])
+        url = data['next']
+    return results
+
+
+class Test10CursorPagination:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_cursor_matches_offset(self, client):
+        create_titles_bulk(25)
+        offset_results = client.get('/api/v1/titles/?limit=100').json()['results']
+        cursor_results = collect_pages(client, '/api/v1/titles/?cursor=&limit=7')
+        assert [t['id'] for t in cursor_results] == [t['id'] for t in offset_results], (
+            'Проверьте, что режим курсора для `/api/v1/titles/` обходит все произведения '
+            'в том же порядке, что и limit/offset'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_cursor_with_equal_dates(self, client, admin_client, admin):
+        from reviews.models import Review
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        Review.objects.update(pub_date=Review.objects.first().pub_date)
+        results = collect_pages(
+            client, f'/api/v1/titles/{titles[0]["id"]}/reviews/?cursor=&limit=1'
+        )
+        assert sorted(r['id'] for r in results) == sorted(r['id'] for r in reviews), (
+            'Проверьте, что режим курсора не теряет и не повторяет отзывы '
+            'с одинаковой датой публикации'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_invalid_cursor(self, client):
+        response = client.get('/api/v1/titles/?cursor=broken')
+        assert response.status_code == 404, (
+            'Проверьте, что при некорректном курсоре возвращается статус 404'
+        )
@@ -0,0 +1,57 @@
+import pytest
+
+from .common import create_categories, create_titles
+
+
+class Test11CountCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_count_is_cached(self, client, admin_client, django_assert_num_queries):
+        create_categories(admin_client)
+        client.get('/api/v1/categories/')
+        with django_assert_num_queries(1):
+            response = client.get('/api/v1/categories/?limit=5')
+        assert response.json()['count'] == 2, (
+            'Проверьте, что повторный GET запрос `/api/v1/categories/` берёт `count` из кэша'
+        )
+        admin_client.post('/api/v1/categories/', data={'name': 'Музыка', 'slug': 'music'})
+        response = client.get('/api/v1/categories/')
+        assert response.json()['count'] == 3, (
+            'Проверьте, что при создании категории закэшированный `count` сбрасывается'
+        )
+        admin_client.delete('/api/v1/categories/music/')
+        response = client.get('/api/v1/categories/')
+        assert response.json()['count'] == 2, (
+            'Проверьте, что при удалении категории закэшированный `count` сбрасывается'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_count_depends_on_filter(self, client, admin_client):
+        titles, _, genres = create_titles(admin_client)
+        assert client.get('/api/v1/titles/').json()['count'] == 2
+        response = client.get(f'/api/v1/titles/?genre={genres[2]["slug"]}')
+        assert response.json()['count'] == 1, (
+            'Проверьте, что закэшированный `count` учитывает параметры фильтрации'
+        )
+        admin_client.patch(f'/api/v1/titles/{titles[0]["id"]}/', data={'genre': [genres[2]['slug']]})
+        response = client.get(f'/api/v1/titles/?genre={genres[2]["slug"]}')
+        assert response.json()['count'] == 2, (
+            'Проверьте, что при изменении жанров произведения закэшированный `count` сбрасывается'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_count_can_be_skipped(self, client, admin_client, django_assert_num_queries):
+        create_categories(admin_client)
+        with django_assert_num_queries(1):
+            response = client.get('/api/v1/categories/?count=false&limit=1')
+        data = response.json()
+        assert data['count'] is None, (
+            'Проверьте, что при `count=false` количество записей не подсчитывается'
+        )
+        assert data['next'] and len(data['results']) == 1, (
+            'Проверьте, что при `count=false` ссылка на следующую страницу формируется'
+        )
+        data = client.get(data['next']).json()
+        assert data['next'] is None and len(data['results']) == 1, (
+            'Проверьте, что при `count=false` на последней странице нет ссылки `next`'
+        )
@@ -0,0 +1,48 @@
+import pytest
+
+from .common import create_titles
+
+
+class Test12TitleSearch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_search_name_and_description(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        response = client.get('/api/v1/titles/?search=драма')
+        assert response.status_code == 200
+        assert [t['id'] for t in response.json()['results']] == [titles[1]['id']], (
+            'Проверьте, что параметр `search` ищет по описанию произведения'
+        )
+        response = client.get('/api/v1/titles/?search=пово')
+        assert [t['id'] for t in response.json()['results']] == [titles[0]['id']], (
+            'Проверьте, что параметр `search` ищет по началу слова в названии произведения'
+        )
+        response = client.get('/api/v1/titles/?search="AND(')
+        assert response.status_code == 200 and response.json()['count'] == 0, (
+            'Проверьте, что служебные символы в параметре `search` не приводят к ошибке'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_search_follows_changes(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        admin_client.patch(f'/api/v1/titles/{titles[0]["id"]}/', data={'name': 'Ураган'})
+        response = client.get('/api/v1/titles/?search=ураган')
+        assert [t['id'] for t in response.json()['results']] == [titles[0]['id']], (
+            'Проверьте, что поисковый индекс обновляется при изменении произведения'
+        )
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        response = client.get('/api/v1/titles/?search=ураган')
+        assert response.json()['count'] == 0, (
+            'Проверьте, что поисковый индекс обновляется при удалении произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_search_is_ranked(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        admin_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/', data={'description': 'Драма драма драма, драма'}
+        )
+        response = client.get('/api/v1/titles/?search=драма')
+        assert [t['id'] for t in response.json()['results']] == [titles[0]['id'], titles[1]['id']], (
+            'Проверьте, что результаты поиска упорядочены по релевантности'
+        )
@@ -0,0 +1,75 @@
+import pytest
+
+from .common import auth_client, create_titles, create_users_api
+
+
+class Test13ResponseCache:
+
+    def check_cache(self, client, admin_client, django_assert_num_queries):
+        from api.cache import get_response_cache_stats
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        assert client.get(url)['X-Cache'] == 'MISS'
+        with django_assert_num_queries(0):
+            response = client.get(url)
+        assert response['X-Cache'] == 'HIT', (
+            'Проверьте, что повторный GET запрос `/api/v1/titles/{title_id}/` отдаётся из кэша'
+        )
+        assert response.json()['rating'] is None
+        user, _ = create_users_api(admin_client)
+        auth_client(user).post(f'{url}reviews/', data={'text': 'Отлично', 'score': 9})
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS' and response.json()['rating'] == 9, (
+            'Проверьте, что после создания отзыва кэш произведения сбрасывается '
+            'и возвращается актуальный `rating`'
+        )
+        assert get_response_cache_stats() == {'hits': 1, 'misses': 2}, (
+            'Проверьте, что счётчики попаданий и промахов кэша ответов обновляются'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_locmem_cache(self, client, admin_client, django_assert_num_queries):
+        self.check_cache(client, admin_client, django_assert_num_queries)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_file_cache(self, client, admin_client, django_assert_num_queries, settings, tmp_path):
+        settings.CACHES = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': str(tmp_path),
+            }
+        }
+        self.check_cache(client, admin_client, django_assert_num_queries)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_category_changes(self, client, admin_client):
+        client.get('/api/v1/categories/')
+        admin_client.post('/api/v1/categories/', data={'name': 'Музыка', 'slug': 'music'})
+        response = client.get('/api/v1/categories/')
+        assert response.json()['count'] == 1, (
+            'Проверьте, что после создания категории кэш списка категорий сбрасывается'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_versions_change_after_commit(self, client, admin_client, admin):
+        from django.db import transaction
+
+        from api.cache import get_model_versions
+        from reviews.models import Genre, GenreTitle, Review, Title
+        titles, _, _ = create_titles(admin_client)
+        title = Title.objects.get(pk=titles[0]['id'])
+        models = (Review, Title, GenreTitle)
+        before = get_model_versions(models)
+        with transaction.atomic():
+            Review.objects.create(title=title, author=admin, text='.', score=9)
+            title.name = 'Новое название'
+            title.save()
+            title.genre.add(Genre.objects.create(name='Драма', slug='new-drama'))
+            assert get_model_versions(models) == before, (
+                'Проверьте, что версии моделей не меняются до фиксации транзакции: '
+                'иначе прежние данные кэшируются под новой версией'
+            )
+        after = get_model_versions(models)
+        assert all(old != new for old, new in zip(before, after)), (
+            'Проверьте, что версии моделей меняются после фиксации транзакции'
+        )
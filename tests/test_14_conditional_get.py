@@ -0,0 +1,79 @@
+import pytest
+
+from .common import auth_client, create_comments, create_reviews
+
+
+class Test14ConditionalGet:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_title_etag(self, client, admin_client, admin):
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        response = client.get(url)
+        etag = response['ETag']
+        assert etag, 'Проверьте, что GET запрос `/api/v1/titles/{title_id}/` возвращает заголовок `ETag`'
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что при совпадении `If-None-Match` возвращается статус 304'
+        )
+        auth_client(user).patch(f'{url}reviews/{reviews[1]["id"]}/', data={'score': 10})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response['ETag'] != etag, (
+            'Проверьте, что после изменения отзыва `ETag` произведения меняется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_etag_and_last_modified(self, client, admin_client, admin):
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304, (
+            'Проверьте, что при `If-Modified-Since` не раньше даты последнего отзыва возвращается статус 304'
+        )
+        auth_client(user).patch(f'{url}{reviews[1]["id"]}/', data={'text': 'Передумал'})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что после изменения отзыва `ETag` списка отзывов меняется'
+        )
+        response = client.get(f'{url}{reviews[1]["id"]}/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304, (
+            'Проверьте, что `If-Modified-Since` поддерживается для отдельного отзыва'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_comments_etag(self, client, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        etag = client.get(url)['ETag']
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        admin_client.post(url, data={'text': 'Новый'})
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200, (
+            'Проверьте, что после создания комментария `ETag` списка комментариев меняется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_user_saves(self, client, admin_client, admin):
+        from reviews.models import User
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        etag = client.get(url)['ETag']
+        response = client.post('/api/v1/auth/signup/', data={'username': 'newbie', 'email': 'newbie@yamdb.fake'})
+        assert response.status_code == 200
+        newbie = User.objects.get(username='newbie')
+        response = client.post('/api/v1/auth/token/', data={
+            'username': 'newbie', 'confirmation_code': newbie.confirmation_code
+        })
+        assert response.status_code == 200
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304, (
+            'Проверьте, что регистрация и получение токена не меняют `ETag` отзывов'
+        )
+        user.username = 'renamed'
+        user.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что после изменения имени пользователя `ETag` отзывов меняется'
+        )
+        assert 'renamed' in {review['author'] for review in response.json()['results']}
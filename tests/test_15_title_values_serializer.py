@@ -0,0 +1,31 @@
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+from .common import create_reviews, create_titles_bulk
+
+
+class Test15TitleValuesSerializer:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_same_bytes_as_model_serializer(self, admin_client, admin):
+        from api.serializers import ReadTitleSerializer, ReadTitleValuesSerializer
+        from reviews.models import Title
+        create_reviews(admin_client, admin)
+        create_titles_bulk(5, genres_per_title=3)
+        Title.objects.filter(pk=Title.objects.last().pk).update(description='')
+        queryset = Title.objects.select_related('category').prefetch_related('genre').order_by('pk')
+        expected = JSONRenderer().render(ReadTitleSerializer(queryset, many=True).data)
+        rows = ReadTitleValuesSerializer.prepare_queryset(queryset)
+        actual = JSONRenderer().render(ReadTitleValuesSerializer(rows, many=True).data)
+        assert actual == expected, (
+            'Проверьте, что ReadTitleValuesSerializer возвращает те же байты, что и ReadTitleSerializer'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_list_uses_values_serializer(self, client, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        data = client.get('/api/v1/titles/').json()['results']
+        detail = client.get(f'/api/v1/titles/{titles[0]["id"]}/').json()
+        assert [title for title in data if title['id'] == titles[0]['id']] == [detail], (
+            'Проверьте, что список и отдельное произведение возвращаются в одном формате'
+        )
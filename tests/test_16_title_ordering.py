@@ -0,0 +1,46 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import captured_select, create_titles_bulk, explain_query_plan
+
+ORDERING_OPTIONS = ('rating', 'year', 'review_count', 'name')
+
+
+class Test16TitleOrdering:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('ordering', [
+        f'{prefix}{name}' for name in ORDERING_OPTIONS for prefix in ('', '-')
+    ])
+    def test_01_ordering_uses_index(self, client, ordering):
+        from reviews.models import Title
+        titles = create_titles_bulk(2000, genres_per_title=1)
+        for number, title in enumerate(titles):
+            Title.objects.filter(pk=title.pk).update(
+                year=1900 + number % 120, rating=number % 10 or None, score_count=number % 7
+            )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/api/v1/titles/?ordering={ordering}&count=false')
+        assert response.status_code == 200
+        plan = explain_query_plan(captured_select(queries.captured_queries, 'reviews_title'))
+        assert not any('TEMP B-TREE' in step for step in plan), (
+            f'Проверьте, что сортировка `ordering={ordering}` обслуживается индексом, план: {plan}'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_ordering_results(self, client):
+        from reviews.models import Title
+        titles = create_titles_bulk(5)
+        for score, title in zip((3, 9, 1, 9, 5), titles):
+            Title.objects.filter(pk=title.pk).update(rating=score, score_sum=score, score_count=1)
+        data = client.get('/api/v1/titles/?ordering=-rating').json()['results']
+        assert [t['id'] for t in data] == [titles[i].pk for i in (3, 1, 4, 0, 2)], (
+            'Проверьте, что `ordering=-rating` сортирует по убыванию рейтинга, а при равенстве - по id'
+        )
+        response = client.get('/api/v1/titles/?ordering=description')
+        assert response.status_code == 400, (
+            'Проверьте, что при недопустимом значении `ordering` возвращается статус 400'
+        )
@@ -0,0 +1,60 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_reviews, create_titles_bulk, explain_query_plan
+
+TOP_QUERY_BUDGET = 4
+
+
+class Test17TopTitles:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_genre_and_category_top(self, client, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        admin_client.post(f'/api/v1/titles/{titles[1]["id"]}/reviews/', data={'text': 'Шедевр', 'score': 9})
+        response = client.get('/api/v1/genres/horror/top/')
+        assert response.status_code == 200, (
+            'Страница `/api/v1/genres/{slug}/top/` не найдена, проверьте этот адрес в *urls.py*'
+        )
+        assert [t['id'] for t in response.json()] == [titles[0]['id']], (
+            'Проверьте, что `/api/v1/genres/{slug}/top/` возвращает произведения жанра с рейтингом'
+        )
+        admin_client.patch(f'/api/v1/titles/{titles[1]["id"]}/', data={'genre': ['horror']})
+        response = client.get('/api/v1/genres/horror/top/')
+        assert [(t['id'], t['rating']) for t in response.json()] == [
+            (titles[1]['id'], 9), (titles[0]['id'], 4)
+        ], (
+            'Проверьте, что при добавлении жанра произведению его рейтинг попадает в рейтинг жанра'
+        )
+        response = client.get(f'/api/v1/categories/{titles[0]["category"]}/top/')
+        assert [t['id'] for t in response.json()] == [titles[0]['id']], (
+            'Проверьте, что `/api/v1/categories/{slug}/top/` возвращает произведения категории'
+        )
+        assert client.get('/api/v1/genres/unknown/top/').status_code == 404
+        call_command('rebuildratings', check=True)
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('url', ('/api/v1/genres/bulk-0/top/', '/api/v1/categories/bulk/top/'))
+    def test_02_top_is_index_range(self, client, django_assert_max_num_queries, url):
+        from reviews.models import GenreTitle, Title
+        titles = create_titles_bulk(2000, genres_per_title=1)
+        for number, title in enumerate(titles):
+            Title.objects.filter(pk=title.pk).update(rating=number % 10 + 1)
+        GenreTitle.objects.all().sync_rating()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        with django_assert_max_num_queries(TOP_QUERY_BUDGET):
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(f'{url}?limit=5')
+        data = response.json()
+        assert [t['rating'] for t in data] == [10] * 5
+        assert [t['id'] for t in data] == sorted((t['id'] for t in data), reverse=True)
+        table = 'reviews_genretitle' if 'genres' in url else 'reviews_title'
+        ranking_sql = next(q['sql'] for q in queries.captured_queries
+                           if f'FROM "{table}"' in q['sql'] and 'ORDER BY' in q['sql'])
+        plan = explain_query_plan(ranking_sql)
+        assert not any('TEMP B-TREE' in step for step in plan), (
+            f'Проверьте, что лучшие произведения выбираются по индексу, план: {plan}'
+        )
@@ -0,0 +1,39 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from .common import create_reviews
+
+
+class Test18ScoreHistogram:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_histogram_on_detail(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        assert 'histogram' not in client.get(url).json(), (
+            'Проверьте, что гистограмма оценок не возвращается без параметра `histogram=true`'
+        )
+        histogram = client.get(f'{url}?histogram=true').json()['histogram']
+        assert histogram == {str(score): int(score in (3, 4, 5)) for score in range(1, 11)}, (
+            'Проверьте, что `histogram` содержит количество каждой оценки от 1 до 10'
+        )
+        admin_client.patch(f'{url}reviews/{reviews[0]["id"]}/', data={'score': 3})
+        admin_client.delete(f'{url}reviews/{reviews[2]["id"]}/')
+        histogram = client.get(f'{url}?histogram=true').json()['histogram']
+        assert histogram['3'] == 2 and histogram['4'] == 0 and histogram['5'] == 0, (
+            'Проверьте, что гистограмма оценок обновляется при изменении и удалении отзывов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_rebuild_histograms(self, admin_client, admin):
+        from reviews.models import Title
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        Title.objects.update(score_3=0, score_7=5)
+        with pytest.raises(CommandError):
+            call_command('rebuildratings', check=True)
+        call_command('rebuildratings')
+        call_command('rebuildratings', check=True)
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_3, title.score_7) == (1, 0), (
+            'Проверьте, что команда `rebuildratings` пересчитывает гистограмму оценок'
+        )
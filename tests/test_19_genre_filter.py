@@ -0,0 +1,43 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import captured_select, create_titles
+
+
+class Test19MultiGenreFilter:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_any_and_all(self, client, admin_client):
+        titles, _, genres = create_titles(admin_client)
+        horror, comedy, drama = (genre['slug'] for genre in genres)
+
+        def ids(query):
+            response = client.get(f'/api/v1/titles/?{query}')
+            assert response.status_code == 200
+            return sorted(t['id'] for t in response.json()['results'])
+
+        both = sorted((titles[0]['id'], titles[1]['id']))
+        assert ids(f'genre={horror},{drama}') == both, (
+            'Проверьте, что `genre=a,b` возвращает произведения хотя бы с одним из жанров'
+        )
+        assert ids(f'genre={horror},{comedy},{drama}') == both, (
+            'Проверьте, что `genre=a,b` не дублирует произведения с несколькими жанрами'
+        )
+        assert ids(f'genre={horror},{comedy}&genre_mode=all') == [titles[0]['id']], (
+            'Проверьте, что `genre_mode=all` возвращает произведения со всеми жанрами'
+        )
+        assert ids(f'genre={horror},{drama}&genre_mode=all') == [], (
+            'Проверьте, что `genre_mode=all` не возвращает произведения без одного из жанров'
+        )
+        assert ids(f'genre={drama}') == [titles[1]['id']]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_no_join_or_distinct(self, client, admin_client):
+        create_titles(admin_client)
+        with CaptureQueriesContext(connection) as queries:
+            client.get('/api/v1/titles/?genre=horror,comedy,drama&genre_mode=all&count=false')
+        sql = captured_select(queries.captured_queries, 'reviews_title')
+        assert 'DISTINCT' not in sql and 'JOIN "reviews_genretitle"' not in sql, (
+            'Проверьте, что фильтр по нескольким жанрам не использует JOIN и DISTINCT'
+        )
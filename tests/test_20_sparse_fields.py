@@ -0,0 +1,107 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_comments, create_reviews
+
+
+def last_select(queries, table):
+    return [
+        query['sql'] for query in queries.captured_queries
+        if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']
+    ][-1]
+
+
+class Test20SparseFields:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_title_list(self, client, admin_client, admin):
+        create_reviews(admin_client, admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/v1/titles/?fields=id,name,rating&ordering=-rating&count=false')
+        assert response.status_code == 200
+        for title in response.json()['results']:
+            assert list(title) == ['id', 'rating', 'name'], (
+                'Проверьте, что параметр `fields` ограничивает поля в списке произведений'
+            )
+        sql = last_select(queries, 'reviews_title')
+        assert 'description' not in sql and 'JOIN' not in sql, (
+            'Проверьте, что ненужные столбцы и связи не попадают в запрос списка произведений'
+        )
+        assert not any('reviews_genretitle' in query['sql'] for query in queries.captured_queries), (
+            'Проверьте, что жанры не загружаются, если поле `genre` не запрошено'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_title_detail(self, client, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        full = client.get(url).json()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'{url}?fields=name,genre,unknown')
+        assert response.json() == {'genre': full['genre'], 'name': full['name']}, (
+            'Проверьте, что параметр `fields` ограничивает поля произведения'
+        )
+        sql = last_select(queries, 'reviews_title')
+        assert 'description' not in sql and 'reviews_category' not in sql
+        assert client.get(f'{url}?fields=unknown').json() == full, (
+            'Проверьте, что без известных полей возвращаются все поля'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_reviews_and_comments(self, client, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'{url}?fields=id,score')
+        for review in response.json()['results']:
+            assert list(review) == ['id', 'score'], (
+                'Проверьте, что параметр `fields` ограничивает поля отзывов'
+            )
+        sql = last_select(queries, 'reviews_review')
+        assert '"text"' not in sql.split(' FROM ')[0] and 'reviews_user' not in sql, (
+            'Проверьте, что ненужные столбцы и связи не попадают в запрос отзывов'
+        )
+
+        response = client.get(f'{url}?fields=id,author')
+        assert {review['author'] for review in response.json()['results']} >= {admin.username}
+
+        url = f'{url}{reviews[0]["id"]}/comments/'
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'{url}?fields=text,author')
+        assert sorted(response.json()['results'], key=lambda c: c['text']) == sorted(
+            ({'text': c['text'], 'author': c['author']} for c in comments), key=lambda c: c['text']
+        ), 'Проверьте, что параметр `fields` ограничивает поля комментариев'
+        sql = last_select(queries, 'reviews_comment')
+        assert 'reviews_review' not in sql.split(' FROM ')[0], (
+            'Проверьте, что связь с отзывом не загружается, если поле `review` не запрошено'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_cursor(self, client, admin_client, admin):
+        create_reviews(admin_client, admin)
+        response = client.get('/api/v1/titles/?fields=id&cursor=&limit=1')
+        assert response.status_code == 200
+        next_url = response.json()['next']
+        assert next_url
+        second = client.get(next_url).json()['results']
+        assert second and second[0]['id'] != response.json()['results'][0]['id']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_no_deferred_loads(self, client, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        client.get(f'{url}reviews/?fields=id,score')
+        with CaptureQueriesContext(connection) as full:
+            client.get(f'{url}reviews/')
+        with CaptureQueriesContext(connection) as sparse:
+            client.get(f'{url}reviews/?fields=id,score,author')
+        assert len(sparse) <= len(full), (
+            'Проверьте, что отложенные поля не загружаются отдельными запросами'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'{url}?histogram=true&fields=histogram')
+        assert list(response.json()) == ['histogram']
+        assert len(queries) == 1, (
+            'Проверьте, что гистограмма читается одним запросом'
+        )
@@ -0,0 +1,54 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from .common import create_titles_bulk
+
+
+class Test21TitleIds:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_ids_filter(self, client):
+        titles = create_titles_bulk(5)
+        ids = [titles[3].pk, titles[1].pk]
+        response = client.get(f'/api/v1/titles/?ids={ids[0]},{ids[1]}')
+        assert response.status_code == 200
+        assert sorted(title['id'] for title in response.json()['results']) == sorted(ids), (
+            'Проверьте, что параметр `ids` возвращает произведения из списка'
+        )
+        response = client.get('/api/v1/titles/?ids=1,abc')
+        assert response.status_code == 400, (
+            'Проверьте, что некорректный параметр `ids` возвращает статус 400'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_bulk_order_and_queries(self, client):
+        titles = create_titles_bulk(60, genres_per_title=3)
+        ids = [title.pk for title in reversed(titles[:50])]
+        url = '/api/v1/titles/bulk/?ids=' + ','.join(map(str, ids + [10 ** 9]))
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert [title['id'] for title in data] == ids, (
+            'Проверьте, что `bulk/` возвращает все найденные произведения в порядке запроса'
+        )
+        assert all(len(title['genre']) == 3 for title in data)
+        assert len(queries) == 2, (
+            'Проверьте, что `bulk/` выполняет фиксированное число запросов'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            client.get('/api/v1/titles/bulk/?ids=' + ','.join(map(str, ids[:5])))
+        assert len(queries) == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_limit(self, client):
+        assert client.get('/api/v1/titles/bulk/').status_code == 400, (
+            'Проверьте, что `bulk/` без параметра `ids` возвращает статус 400'
+        )
+        with override_settings(TITLE_IDS_LIMIT=3):
+            response = client.get('/api/v1/titles/bulk/?ids=1,2,3,4')
+            assert response.status_code == 400, (
+                'Проверьте, что число id ограничено настройкой TITLE_IDS_LIMIT'
+            )
+            assert client.get('/api/v1/titles/bulk/?ids=1,2,3').status_code == 200
@@ -0,0 +1,52 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_titles
+
+
+class Test22TitleFacets:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_counts(self, client, admin_client):
+        create_titles(admin_client)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/v1/titles/facets/')
+        assert response.status_code == 200
+        data = response.json()
+        assert len(queries) == 4, (
+            'Проверьте, что срезы считаются фиксированным числом запросов с группировкой'
+        )
+        assert data['count'] == 2
+        assert {row['slug']: row['count'] for row in data['genre']} == {
+            'comedy': 1, 'drama': 1, 'horror': 1
+        }, 'Проверьте количество произведений по жанрам'
+        assert sum(row['count'] for row in data['category']) == 2
+        assert data['year'] == [
+            {'from': 2000, 'to': 2009, 'count': 1},
+            {'from': 2020, 'to': 2029, 'count': 1},
+        ], 'Проверьте количество произведений по десятилетиям'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_filters_and_cache(self, client, admin_client):
+        titles, categories, _ = create_titles(admin_client)
+        data = client.get('/api/v1/titles/facets/?genre=horror,drama&year=2020').json()
+        assert data['count'] == 1
+        assert [row['slug'] for row in data['genre']] == ['drama'], (
+            'Проверьте, что срезы учитывают параметры TitleFilter'
+        )
+        data = client.get('/api/v1/titles/facets/?search=пике').json()
+        assert data['count'] == 1
+
+        url = '/api/v1/titles/facets/'
+        client.get(url)
+        assert client.get(url)['X-Cache'] == 'HIT'
+        admin_client.post('/api/v1/titles/', data={
+            'name': 'Новое', 'year': 1995, 'genre': ['drama'],
+            'category': categories[0]['slug'],
+        })
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что запись произведения делает срезы неактуальными'
+        )
+        assert response.json()['count'] == 3
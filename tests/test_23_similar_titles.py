@@ -0,0 +1,136 @@
+from io import StringIO
+from math import isclose, sqrt
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Count
+
+from .common import create_titles_bulk
+
+SCORES = {
+    'u0': (9, 8, None, 1),
+    'u1': (7, 7, 2, None),
+    'u2': (None, 6, 9, 3),
+    'u3': (2, None, 8, 10),
+}
+
+
+def create_scores(django_user_model, scores=SCORES):
+    from reviews.models import Review
+    titles = create_titles_bulk(4)
+    for username, row in scores.items():
+        user = django_user_model.objects.create_user(username=username)
+        for title, score in zip(titles, row):
+            if score is not None:
+                Review.objects.create(author=user, title=title, text='.', score=score)
+    return titles
+
+
+def expected_similarity(scores=SCORES):
+    columns = list(zip(*scores.values()))
+
+    def cosine(a, b):
+        dot = sum(x * y for x, y in zip(a, b) if x and y)
+        return dot / sqrt(sum(x * x for x in a if x)) / sqrt(sum(y * y for y in b if y))
+
+    return {
+        (i, j): cosine(columns[i], columns[j])
+        for i in range(len(columns)) for j in range(len(columns)) if i != j
+    }
+
+
+def stored_lists():
+    from reviews.models import SimilarTitle
+    return sorted(
+        (title, similar, round(score, 5))
+        for title, similar, score in SimilarTitle.objects.values_list('title', 'similar', 'score')
+    )
+
+
+class Test23SimilarTitles:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_endpoint(self, client, django_user_model):
+        titles = create_scores(django_user_model)
+        call_command('buildsimilar', stdout=StringIO())
+        expected = expected_similarity()
+        response = client.get(f'/api/v1/titles/{titles[0].pk}/similar/')
+        assert response.status_code == 200
+        data = response.json()
+        index = {title.pk: i for i, title in enumerate(titles)}
+        assert [title['id'] for title in data] == [
+            titles[j].pk for j in sorted((1, 2, 3), key=lambda j: -expected[(0, j)])
+        ], 'Проверьте, что похожие произведения упорядочены по убыванию сходства'
+        for title in data:
+            assert isclose(title['similarity'], expected[(0, index[title['id']])], rel_tol=1e-5), (
+                'Проверьте, что сходство произведений косинусное'
+            )
+        assert set(data[0]) >= {'id', 'name', 'genre', 'category', 'rating'}
+        assert len(client.get(f'/api/v1/titles/{titles[0].pk}/similar/?limit=1').json()) == 1
+        assert client.get('/api/v1/titles/999999/similar/').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_top_k(self, django_user_model):
+        from reviews.models import SimilarTitle
+        create_scores(django_user_model)
+        call_command('buildsimilar', top_k=2, stdout=StringIO())
+        counts = set(SimilarTitle.objects.values('title').annotate(
+            n=Count('id')
+        ).values_list('n', flat=True))
+        assert counts == {2}, 'Проверьте, что для произведения хранится не больше K похожих'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_incremental(self, django_user_model):
+        from reviews.models import Review, Title
+        titles = create_scores(django_user_model)
+        call_command('buildsimilar', block_size=1, stdout=StringIO())
+        assert not Title.objects.filter(similar_stale=True).exists()
+
+        user = django_user_model.objects.get(username='u0')
+        Review.objects.create(author=user, title=titles[2], text='.', score=4)
+        assert list(Title.objects.filter(similar_stale=True)) == [titles[2]], (
+            'Проверьте, что новая оценка помечает похожие произведения устаревшими'
+        )
+        call_command('buildsimilar', stdout=StringIO())
+        incremental = stored_lists()
+        call_command('buildsimilar', full=True, stdout=StringIO())
+        assert incremental == stored_lists(), (
+            'Проверьте, что инкрементальный пересчёт совпадает с полным'
+        )
+        scores = dict(SCORES, u0=(9, 8, 4, 1))
+        similar = dict(
+            ((title, similar), score) for title, similar, score in incremental
+        )
+        for (i, j), value in expected_similarity(scores).items():
+            assert isclose(similar[(titles[i].pk, titles[j].pk)], value, rel_tol=1e-4)
+
+        Review.objects.filter(title=titles[3]).delete()
+        call_command('buildsimilar', stdout=StringIO())
+        assert all(titles[3].pk not in row[:2] for row in stored_lists()), (
+            'Проверьте, что произведение без оценок исчезает из похожих'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_incremental_many_stale(self, django_user_model, monkeypatch):
+        from reviews.management.commands import buildsimilar
+        from reviews.models import Title
+        titles = create_scores(django_user_model)
+        call_command('buildsimilar', top_k=1, stdout=StringIO())
+        Title.objects.exclude(pk=titles[0].pk).update(similar_stale=True)
+        merged = []
+        merge_candidates = buildsimilar.Command.merge_candidates
+
+        def capture(self, candidates, *args):
+            merged.append(candidates)
+            return merge_candidates(self, candidates, *args)
+
+        monkeypatch.setattr(buildsimilar.Command, 'merge_candidates', capture)
+        call_command('buildsimilar', top_k=1, block_size=1, stdout=StringIO())
+        assert len(merged[0]) == 1 and merged[0][0][0] == titles[0].pk, (
+            'Проверьте, что для каждого произведения остаётся не больше K новых значений сходства'
+        )
+        incremental = stored_lists()
+        call_command('buildsimilar', top_k=1, full=True, stdout=StringIO())
+        assert incremental == stored_lists(), (
+            'Проверьте, что инкрементальный пересчёт большой доли произведений совпадает с полным'
+        )
@@ -0,0 +1,85 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from .common import auth_client, create_titles_bulk
+
+SCORES = {
+    'u0': (10, 9, None, 1, 2),
+    'u1': (9, 10, 8, 2, None),
+    'u2': (None, 9, 10, 1, 1),
+    'u3': (1, 2, None, 10, 9),
+    'u4': (2, None, 1, 9, 10),
+}
+
+
+def create_scores(django_user_model):
+    from reviews.models import Review
+    titles = create_titles_bulk(5)
+    users = {}
+    for username, row in SCORES.items():
+        users[username] = django_user_model.objects.create_user(username=username)
+        for title, score in zip(titles, row):
+            if score is not None:
+                Review.objects.create(author=users[username], title=title, text='.', score=score)
+    return titles, users
+
+
+def stored():
+    from reviews.models import Recommendation
+    return sorted(
+        (user, title, round(score, 6))
+        for user, title, score in Recommendation.objects.values_list('user', 'title', 'score')
+    )
+
+
+class Test24Recommendations:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_unseen_titles(self, django_user_model):
+        from reviews.models import Recommendation, Review
+        titles, users = create_scores(django_user_model)
+        out = StringIO()
+        call_command('buildrecommendations', factors=3, iterations=15, stdout=out)
+        assert 'RMSE' in out.getvalue() and 'пользователей/с' in out.getvalue(), (
+            'Проверьте, что команда выводит время и скорость расчёта'
+        )
+        seen = set(Review.objects.values_list('author', 'title'))
+        pairs = set(Recommendation.objects.values_list('user', 'title'))
+        assert pairs and not pairs & seen, (
+            'Проверьте, что рекомендуются только произведения без отзыва пользователя'
+        )
+        assert set(Recommendation.objects.filter(user=users['u0']).values_list('title', flat=True)) == {
+            titles[2].pk
+        }
+        assert list(Recommendation.objects.filter(user=users['u1']).values_list('title', flat=True)) == [
+            titles[4].pk
+        ]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_endpoint(self, client, django_user_model):
+        titles, users = create_scores(django_user_model)
+        call_command('buildrecommendations', factors=3, iterations=15, stdout=StringIO())
+        url = '/api/v1/users/me/recommendations/'
+        assert client.get(url).status_code == 401
+        response = auth_client(users['u2']).get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert [title['id'] for title in data] == [titles[0].pk], (
+            'Проверьте, что `users/me/recommendations/` возвращает рекомендации пользователя'
+        )
+        assert isinstance(data[0]['predicted_score'], float)
+        assert data[0]['predicted_score'] > 5, (
+            'Проверьте, что похожий по оценкам пользователь получает высокую оценку'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_workers_and_chunks(self, django_user_model):
+        create_scores(django_user_model)
+        call_command('buildrecommendations', factors=3, stdout=StringIO())
+        expected = stored()
+        call_command('buildrecommendations', factors=3, workers=2, chunk_size=2, stdout=StringIO())
+        assert stored() == expected, (
+            'Проверьте, что результат не зависит от числа процессов и размера порций'
+        )
@@ -0,0 +1,66 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import auth_client, create_comments, create_titles
+
+
+def selects(queries, table):
+    return [
+        query['sql'] for query in queries.captured_queries
+        if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']
+    ]
+
+
+class Test25ParentLookup:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_review_create_fetches_title_once(self, admin_client, user):
+        titles, _, _ = create_titles(admin_client)
+        with CaptureQueriesContext(connection) as queries:
+            response = auth_client(user).post(
+                f'/api/v1/titles/{titles[0]["id"]}/reviews/', data={'text': 'Текст', 'score': 5}
+            )
+        assert response.status_code == 201
+        assert len(selects(queries, 'reviews_title')) == 1, (
+            'Проверьте, что произведение загружается один раз за запрос создания отзыва'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_lists_check_existence(self, client, admin_client, admin):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        with CaptureQueriesContext(connection) as queries:
+            assert client.get(url).status_code == 200
+        title_queries = selects(queries, 'reviews_title')
+        assert len(title_queries) == 1 and '"reviews_title"."name"' not in title_queries[0], (
+            'Проверьте, что для списка отзывов существование произведения проверяется без выборки столбцов'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            assert client.get(f'{url}{reviews[0]["id"]}/').status_code == 200
+        assert not selects(queries, 'reviews_title'), (
+            'Проверьте, что отдельный отзыв выбирается без загрузки произведения'
+        )
+        url = f'{url}{reviews[0]["id"]}/comments/?fields=id,text,author'
+        with CaptureQueriesContext(connection) as queries:
+            assert client.get(url).status_code == 200
+        review_queries = selects(queries, 'reviews_review')
+        assert len(review_queries) == 1 and '"reviews_review"."text"' not in review_queries[0], (
+            'Проверьте, что для списка комментариев существование отзыва проверяется без выборки столбцов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_not_found(self, client, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        other = titles[1]['id']
+        assert client.get('/api/v1/titles/999999/reviews/').status_code == 404
+        assert admin_client.post(
+            '/api/v1/titles/999999/reviews/', data={'text': 'Текст', 'score': 5}
+        ).status_code == 404
+        wrong = f'/api/v1/titles/{other}/reviews/{reviews[0]["id"]}/comments/'
+        assert client.get(wrong).status_code == 404, (
+            'Проверьте, что комментарии отзыва недоступны по маршруту другого произведения'
+        )
+        assert client.get(f'{wrong}{comments[0]["id"]}/').status_code == 404
+        assert admin_client.post(wrong, data={'text': 'Текст'}).status_code == 404
+        assert client.get(f'/api/v1/titles/{other}/reviews/{reviews[0]["id"]}/').status_code == 404
@@ -0,0 +1,104 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_comments
+
+COMPACT = 'application/json; version=2'
+
+
+def add_comments(review_id, count):
+    from django.contrib.auth import get_user_model
+    from reviews.models import Comment
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(username=f'commenter{review_id}_{i}', email=f'c{review_id}_{i}@yamdb.fake')
+        for i in range(count)
+    )
+    users = User.objects.filter(username__startswith=f'commenter{review_id}_')
+    Comment.objects.bulk_create(
+        Comment(review_id=review_id, author=user, text=f'Комментарий {user.pk}')
+        for user in users
+    )
+
+
+class Test26CompactComments:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_formats(self, client, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.data['results'][0]['review'] == reviews[0]['text'], (
+            'Проверьте, что без версии комментарий возвращается в прежнем формате'
+        )
+        response = client.get(url, HTTP_ACCEPT=COMPACT)
+        assert response.status_code == 200
+        assert {item['review'] for item in response.data['results']} == {reviews[0]['id']}, (
+            'Проверьте, что в версии 2 вместо текста отзыва возвращается его id'
+        )
+        assert set(response.data['results'][0]) == {'id', 'text', 'author', 'pub_date', 'review'}
+        response = client.get(f'{url}{comments[0]["id"]}/', HTTP_ACCEPT=COMPACT)
+        assert response.status_code == 200 and response.data['review'] == reviews[0]['id']
+        assert 'Accept' in response['Vary'], (
+            'Проверьте, что ответ комментариев зависит от заголовка Accept'
+        )
+        response = admin_client.post(url, data={'text': 'Новый'}, HTTP_ACCEPT=COMPACT)
+        assert response.status_code == 201 and response.data['review'] == reviews[0]['id']
+        assert client.get(url, HTTP_ACCEPT='application/json; version=3').status_code == 406, (
+            'Проверьте, что неизвестная версия формата отклоняется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_fixed_query_count(self, client, admin_client, admin):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        base = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        counts = {}
+        for review, extra in ((reviews[1], 3), (reviews[2], 30)):
+            add_comments(review['id'], extra)
+            url = f'{base}{review["id"]}/comments/?limit=100'
+            for accept in ('application/json', COMPACT):
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url, HTTP_ACCEPT=accept)
+                assert response.status_code == 200
+                assert len(response.data['results']) == extra
+                counts.setdefault(accept, set()).add(len(queries))
+        assert all(len(values) == 1 for values in counts.values()), (
+            'Проверьте, что число запросов списка комментариев не зависит от их количества'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_compact_skips_review(self, client, admin_client, admin):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        with CaptureQueriesContext(connection) as queries:
+            assert client.get(url, HTTP_ACCEPT=COMPACT).status_code == 200
+        comment_queries = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and 'FROM "reviews_comment"' in query['sql']
+            and 'COUNT(' not in query['sql'] and 'MAX(' not in query['sql']
+        ]
+        assert len(comment_queries) == 1
+        select = comment_queries[0].split(' FROM ')[0]
+        assert '"reviews_user"."username"' in select, (
+            'Проверьте, что автор выбирается тем же запросом, что и комментарии'
+        )
+        assert '"reviews_review"."text"' not in select, (
+            'Проверьте, что в версии 2 текст отзыва не загружается'
+        )
+        assert len([
+            query for query in queries.captured_queries
+            if 'FROM "reviews_user"' in query['sql']
+        ]) == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_etag_per_version(self, client, admin_client, admin):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        etag = client.get(url)['ETag']
+        assert client.get(url, HTTP_ACCEPT=COMPACT)['ETag'] != etag, (
+            'Проверьте, что ETag различается для разных версий формата'
+        )
+        response = client.get(url, HTTP_ACCEPT=COMPACT, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
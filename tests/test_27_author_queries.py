@@ -0,0 +1,71 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_titles_bulk
+
+PAGE_SIZES = (10, 100, 1000)
+
+
+def create_authors(count):
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(username=f'author{i}', email=f'author{i}@yamdb.fake')
+        for i in range(count)
+    )
+    return list(User.objects.filter(username__startswith='author').order_by('pk'))
+
+
+def create_page_data(count):
+    """Создаёт произведение с `count` отзывами и отзыв с `count` комментариями."""
+    from reviews.models import Comment, Review
+    title = create_titles_bulk(1)[0]
+    authors = create_authors(count)
+    Review.objects.bulk_create(
+        Review(title=title, author=author, text=f'Отзыв {author.pk}', score=5)
+        for author in authors
+    )
+    review = Review.objects.filter(title=title).order_by('pk').first()
+    Comment.objects.bulk_create(
+        Comment(review=review, author=author, text=f'Комментарий {author.pk}')
+        for author in authors
+    )
+    return title, review
+
+
+def list_queries(client, url, count):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(f'{url}?limit={count}')
+    assert response.status_code == 200
+    assert len(response.data['results']) == count
+    assert all(item['author'].startswith('author') for item in response.data['results'])
+    user_queries = [
+        query['sql'] for query in queries.captured_queries
+        if query['sql'].split(' FROM ')[-1].startswith('"reviews_user"')
+    ]
+    assert not user_queries, (
+        f'Проверьте, что авторы списка {url} выбираются тем же запросом, что и записи'
+    )
+    return len(queries)
+
+
+class Test27AuthorQueries:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('count', PAGE_SIZES)
+    def test_01_reviews(self, client, count):
+        title, _ = create_page_data(count)
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        assert list_queries(client, url, count) == 4, (
+            'Проверьте, что число запросов списка отзывов не зависит от размера страницы'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('count', PAGE_SIZES)
+    def test_02_comments(self, client, count):
+        title, review = create_page_data(count)
+        url = f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+        assert list_queries(client, url, count) == 4, (
+            'Проверьте, что число запросов списка комментариев не зависит от размера страницы'
+        )
@@ -0,0 +1,117 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+
+from .common import auth_client, create_titles
+
+PARALLEL_POSTS = 8
+LOCK_TIMEOUT = 30
+
+
+@pytest.fixture
+def file_database(transactional_db, tmp_path, monkeypatch):
+    """
+    Переключает тест на SQLite в файле: тестовая БД в памяти с общим кэшем
+    сразу отклоняет параллельную запись (table is locked), а к файлу
+    пишущие соединения ждут блокировку до LOCK_TIMEOUT секунд.
+    Транзакции начинаются с BEGIN IMMEDIATE: иначе транзакция, прочитавшая
+    данные до записи, получает database is locked без ожидания.
+    Соединения других потоков создаются по connections.databases.
+    """
+    memory = connections['default']
+    monkeypatch.setattr(
+        memory.__class__, '_start_transaction_under_autocommit',
+        lambda wrapper: wrapper.cursor().execute('BEGIN IMMEDIATE')
+    )
+    settings_dict = dict(
+        memory.settings_dict, NAME=str(tmp_path / 'db.sqlite3'),
+        OPTIONS={**memory.settings_dict['OPTIONS'], 'timeout': LOCK_TIMEOUT},
+    )
+    connections.databases['default'] = settings_dict
+    connections['default'] = memory.__class__(settings_dict, 'default')
+    try:
+        call_command('migrate', verbosity=0, interactive=False)
+        yield
+    finally:
+        connections['default'].close()
+        connections['default'] = memory
+        connections.databases['default'] = memory.settings_dict
+
+
+class Test28ReviewUniqueness:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_single_insert(self, admin_client, user):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        client = auth_client(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(url, data={'text': 'Текст', 'score': 5})
+        assert response.status_code == 201
+        assert not [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and 'FROM "reviews_review"' in query['sql']
+        ], 'Проверьте, что перед созданием отзыва не выполняется проверка существования'
+        response = client.post(url, data={'text': 'Ещё текст', 'score': 3})
+        assert response.status_code == 400
+        assert response.json() == {'non_field_errors': ['Извините, возможен только один отзыв']}, (
+            'Проверьте, что повторный отзыв возвращает прежнюю ошибку валидации'
+        )
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.json()['rating'] == 5, (
+            'Проверьте, что отклонённый отзыв не меняет рейтинг произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_duplicate_inserted_during_request(self, admin_client, user, monkeypatch):
+        from api.serializers import ReviewSerializer
+        from reviews.models import Review
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        validate = ReviewSerializer.validate
+
+        def validate_then_race(serializer, attrs):
+            # другой запрос создаёт отзыв сразу после валидации этого запроса
+            attrs = validate(serializer, attrs)
+            Review.objects.create(
+                title_id=titles[0]['id'], author=user, text='Параллельный', score=1
+            )
+            return attrs
+
+        monkeypatch.setattr(ReviewSerializer, 'validate', validate_then_race)
+        response = auth_client(user).post(url, data={'text': 'Текст', 'score': 5})
+        assert response.status_code == 400, (
+            'Проверьте, что отзыв, созданный параллельным запросом, приводит к статусу 400, а не к ошибке сервера'
+        )
+        assert Review.objects.filter(title_id=titles[0]['id'], author=user).count() == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_parallel_duplicates(self, file_database, admin_client, user):
+        from reviews.models import Review, Title
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        barrier = threading.Barrier(PARALLEL_POSTS)
+
+        def post(score):
+            client = auth_client(user)
+            barrier.wait()
+            try:
+                return client.post(url, data={'text': f'Текст {score}', 'score': score}).status_code
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(PARALLEL_POSTS) as executor:
+            statuses = list(executor.map(post, range(1, PARALLEL_POSTS + 1)))
+        assert sorted(statuses) == [201] + [400] * (PARALLEL_POSTS - 1), (
+            'Проверьте, что из параллельных повторных отзывов создаётся один, '
+            'а остальные получают статус 400'
+        )
+        assert Review.objects.filter(title_id=titles[0]['id'], author=user).count() == 1
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert title.score_count == 1, (
+            'Проверьте, что отклонённые отзывы не учитываются в рейтинге'
+        )
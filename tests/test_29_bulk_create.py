@@ -0,0 +1,191 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .common import auth_client, create_reviews, create_titles_bulk
+
+REVIEWS_URL = '/api/v1/reviews/bulk/'
+COMMENTS_URL = '/api/v1/comments/bulk/'
+
+
+def create_authors(count, prefix='bulk'):
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(username=f'{prefix}{i}', email=f'{prefix}{i}@yamdb.fake')
+        for i in range(count)
+    )
+    return [f'{prefix}{i}' for i in range(count)]
+
+
+def review_items(titles, authors, score=5):
+    return [
+        {'title': title.pk, 'author': author, 'text': f'Отзыв {author}', 'score': score}
+        for title in titles for author in authors
+    ]
+
+
+class Test29BulkCreate:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reviews(self, admin_client):
+        from reviews.models import Review, Title
+        titles = create_titles_bulk(2)
+        authors = create_authors(3)
+        items = review_items(titles[:1], authors, score=4) + review_items(titles[1:], authors[:1], score=8)
+        response = admin_client.post(REVIEWS_URL, data=items, format='json')
+        assert response.status_code == 201, response.json()
+        assert response.json() == {'created': 4}
+        assert Review.objects.filter(title__in=titles).count() == 4
+        first, second = Title.objects.filter(pk__in=[t.pk for t in titles]).order_by('pk')
+        assert (first.score_count, first.rating, second.score_count, second.rating) == (3, 4, 1, 8), (
+            'Проверьте, что пакетное создание отзывов обновляет рейтинг произведений'
+        )
+        response = admin_client.get(f'/api/v1/titles/{first.pk}/reviews/')
+        assert response.json()['count'] == 3, (
+            'Проверьте, что после пакетного создания список отзывов не берётся из устаревшего кэша'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_default_author(self, user):
+        from reviews.models import Review
+        titles = create_titles_bulk(2)
+        items = [{'title': title.pk, 'text': 'Текст', 'score': 7} for title in titles]
+        response = auth_client(user).post(REVIEWS_URL, data=items, format='json')
+        assert response.status_code == 201
+        assert Review.objects.filter(author=user).count() == 2, (
+            'Проверьте, что без поля author автор отзыва - пользователь запроса'
+        )
+        items = [{'title': titles[0].pk, 'author': 'someone', 'text': 'Текст', 'score': 7}]
+        response = auth_client(user).post(REVIEWS_URL, data=items, format='json')
+        assert response.status_code == 400
+        assert 'author' in response.json()[0], (
+            'Проверьте, что указать автора может только администратор'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_per_item_errors(self, admin_client, admin):
+        from reviews.models import Review
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        authors = create_authors(2)
+        items = [
+            {'title': titles[0]['id'], 'author': authors[0], 'text': 'Верный', 'score': 5},
+            {'title': 999999, 'author': authors[0], 'text': 'Нет произведения', 'score': 5},
+            {'title': titles[0]['id'], 'author': user.username, 'text': 'Уже есть', 'score': 5},
+            {'title': titles[0]['id'], 'author': authors[1], 'text': 'Первый', 'score': 5},
+            {'title': titles[0]['id'], 'author': authors[1], 'text': 'Повтор', 'score': 5},
+            {'title': titles[0]['id'], 'author': 'nobody', 'text': 'Нет автора', 'score': 5},
+            {'title': titles[0]['id'], 'author': authors[0], 'text': 'Оценка', 'score': 11},
+        ]
+        count = Review.objects.count()
+        response = admin_client.post(REVIEWS_URL, data=items, format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert len(errors) == len(items), (
+            'Проверьте, что ошибки пакета возвращаются по одной записи на элемент'
+        )
+        assert errors[-1].keys() == {'score'}
+        assert Review.objects.count() == count, (
+            'Проверьте, что при ошибках в пакете отзывы не создаются'
+        )
+        response = admin_client.post(REVIEWS_URL, data=items[:-1], format='json')
+        assert response.status_code == 400
+        assert response.json() == errors[:-1], (
+            'Проверьте, что ошибки полей одних элементов не скрывают ошибки пакета у других'
+        )
+        assert errors[0] == {} and errors[3] == {}
+        assert 'title' in errors[1]
+        assert errors[2] == {'non_field_errors': ['Извините, возможен только один отзыв']}
+        assert errors[4] == errors[2], (
+            'Проверьте, что повтор пары автор/произведение внутри пакета считается ошибкой'
+        )
+        assert 'author' in errors[5]
+        assert Review.objects.count() == count
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_query_count(self, admin_client):
+        titles = create_titles_bulk(2)
+        counts = []
+        for size, prefix in ((5, 'small'), (300, 'large')):
+            authors = create_authors(size, prefix)
+            items = review_items(titles, authors)
+            with CaptureQueriesContext(connection) as queries:
+                response = admin_client.post(REVIEWS_URL, data=items, format='json')
+            assert response.status_code == 201
+            counts.append(len([
+                query for query in queries.captured_queries
+                if not query['sql'].startswith('INSERT')
+            ]))
+        assert counts[0] == counts[1], (
+            'Проверьте, что число запросов пакета, кроме INSERT, не зависит от числа отзывов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_limit(self, admin_client, settings):
+        settings.BULK_CREATE_LIMIT = 2
+        titles = create_titles_bulk(3)
+        items = [{'title': title.pk, 'text': 'Текст', 'score': 5} for title in titles]
+        response = admin_client.post(REVIEWS_URL, data=items, format='json')
+        assert response.status_code == 400
+        assert 'non_field_errors' in response.json()
+        assert admin_client.post(REVIEWS_URL, data=[], format='json').status_code == 400
+        assert admin_client.post(REVIEWS_URL, data={}, format='json').status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_comments(self, admin_client, admin):
+        from reviews.models import Comment
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        items = [
+            {'review': review['id'], 'text': f'Комментарий {review["id"]}'}
+            for review in reviews
+        ]
+        response = auth_client(user).post(COMMENTS_URL, data=items, format='json')
+        assert response.status_code == 201
+        assert response.json() == {'created': 3}
+        assert Comment.objects.filter(author=user).count() == 3
+        response = admin_client.post(
+            COMMENTS_URL, data=items[:1] + [{'review': 999999, 'text': 'Нет отзыва'}], format='json'
+        )
+        assert response.status_code == 400
+        assert response.json()[0] == {} and 'review' in response.json()[1]
+        assert APIClient().post(COMMENTS_URL, data=items, format='json').status_code == 401
+
+    @pytest.mark.django_db(transaction=True)
+    def test_07_duplicate_inserted_during_request(self, admin_client, monkeypatch):
+        from api.serializers import BulkReviewListSerializer
+        from reviews.models import Review, User
+        titles = create_titles_bulk(1)
+        authors = create_authors(2)
+        to_internal_value = BulkReviewListSerializer.to_internal_value
+
+        def validate_then_race(serializer, data):
+            # другой запрос создаёт отзыв сразу после проверки пакета
+            items = to_internal_value(serializer, data)
+            Review.objects.create(
+                title=titles[0], author=User.objects.get(username=authors[1]), text='Параллельный', score=1
+            )
+            return items
+
+        monkeypatch.setattr(BulkReviewListSerializer, 'to_internal_value', validate_then_race)
+        response = admin_client.post(REVIEWS_URL, data=review_items(titles, authors), format='json')
+        assert response.status_code == 400
+        assert response.json()[0] == {} and 'non_field_errors' in response.json()[1]
+        assert Review.objects.filter(title=titles[0]).count() == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_08_field_and_batch_errors(self, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        items = [
+            {'title': 999999, 'text': 'Нет произведения', 'score': 5},
+            {'title': 'x', 'text': 'Неверный id', 'score': 50},
+            {'title': titles[1]['id'], 'text': 'Верный', 'score': 5},
+        ]
+        response = admin_client.post(REVIEWS_URL, data=items, format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert 'title' in errors[0], (
+            'Проверьте, что несуществующее произведение отмечается, даже если в других элементах ошибки полей'
+        )
+        assert errors[1].keys() == {'title', 'score'}
+        assert errors[2] == {}
@@ -0,0 +1,128 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from .common import auth_client, create_comments
+
+
+def comment_counts():
+    from reviews.models import Review
+    return dict(Review.objects.values_list('pk', 'comment_count'))
+
+
+class Test30Counters:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_exposed(self, client, admin_client, admin):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        counts = {item['id']: item['comment_count'] for item in client.get(url).json()['results']}
+        assert counts == {reviews[0]['id']: 3, reviews[1]['id']: 0, reviews[2]['id']: 0}, (
+            'Проверьте, что в списке отзывов выводится количество комментариев'
+        )
+        assert client.get(f'{url}{reviews[0]["id"]}/').json()['comment_count'] == 3
+        assert client.get(f'/api/v1/titles/{titles[0]["id"]}/').json()['review_count'] == 3, (
+            'Проверьте, что у произведения выводится количество отзывов'
+        )
+        results = client.get('/api/v1/titles/').json()['results']
+        assert {item['id']: item['review_count'] for item in results} == {
+            titles[0]['id']: 3, titles[1]['id']: 0
+        }
+        results = client.get('/api/v1/titles/?fields=id,review_count').json()['results']
+        assert set(results[0]) == {'id', 'review_count'}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_maintained(self, admin_client, admin):
+        from reviews.models import Review
+        comments, reviews, titles, user, moderator = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/comments/'
+        response = auth_client(user).post(url, data={'text': 'Ещё'})
+        assert response.status_code == 201
+        assert comment_counts()[reviews[1]['id']] == 1, (
+            'Проверьте, что создание комментария увеличивает количество комментариев отзыва'
+        )
+        response = admin_client.delete(f'{url}{response.json()["id"]}/')
+        assert response.status_code == 204
+        assert comment_counts()[reviews[1]['id']] == 0, (
+            'Проверьте, что удаление комментария уменьшает количество комментариев отзыва'
+        )
+        comment = Review.objects.get(pk=reviews[0]['id']).comments.first()
+        comment.review_id = reviews[2]['id']
+        comment.save()
+        assert comment_counts()[reviews[0]['id']] == 2
+        assert comment_counts()[reviews[2]['id']] == 1
+        moderator.delete()
+        assert sum(comment_counts().values()) == 2, (
+            'Проверьте, что каскадное удаление комментариев уменьшает их количество'
+        )
+        response = admin_client.post(
+            '/api/v1/comments/bulk/',
+            data=[{'review': reviews[1]['id'], 'text': str(i)} for i in range(4)],
+            format='json'
+        )
+        assert response.status_code == 201
+        assert comment_counts()[reviews[1]['id']] == 4, (
+            'Проверьте, что пакетное создание комментариев обновляет их количество'
+        )
+        call_command('rebuildcommentcounts', check=True)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_rebuild_command(self, admin_client, admin):
+        from reviews.models import Review
+        _, reviews, _, _, _ = create_comments(admin_client, admin)
+        call_command('rebuildcommentcounts', check=True)
+        Review.objects.filter(pk=reviews[0]['id']).update(comment_count=7)
+        Review.objects.filter(pk=reviews[1]['id']).update(comment_count=2)
+        with pytest.raises(CommandError):
+            call_command('rebuildcommentcounts', check=True)
+        call_command('rebuildcommentcounts')
+        assert comment_counts() == {reviews[0]['id']: 3, reviews[1]['id']: 0, reviews[2]['id']: 0}
+        call_command('rebuildcommentcounts', check=True)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_review_etag_follows_comments(self, client, admin_client, admin):
+        from reviews.models import Review
+        _, reviews, titles, user, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/'
+        etag = client.get(url)['ETag']
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        auth_client(user).post(f'{url}comments/', data={'text': 'Ещё'})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response.json()['comment_count'] == 1, (
+            'Проверьте, что после создания комментария `ETag` отзыва меняется'
+        )
+        etag = response['ETag']
+        response = admin_client.post(
+            '/api/v1/comments/bulk/', data=[{'review': reviews[1]['id'], 'text': 'Пакет'}],
+            format='json'
+        )
+        assert response.status_code == 201
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response.json()['comment_count'] == 2, (
+            'Проверьте, что после пакетного создания комментариев `ETag` отзыва меняется'
+        )
+        etag = response['ETag']
+        Review.objects.filter(pk=reviews[1]['id']).update(comment_count=0)
+        call_command('rebuildcommentcounts')
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200, (
+            'Проверьте, что после команды `rebuildcommentcounts` `ETag` отзыва меняется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_comment_and_count_are_atomic(self, admin_client, admin, monkeypatch):
+        from django.db import DatabaseError
+
+        from reviews.models import Comment, ReviewQuerySet
+        _, reviews, titles, user, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/comments/'
+        count = Comment.objects.count()
+
+        def fail(queryset, delta):
+            raise DatabaseError('Сбой обновления количества комментариев')
+
+        monkeypatch.setattr(ReviewQuerySet, 'shift_comment_count', fail)
+        with pytest.raises(DatabaseError):
+            auth_client(user).post(url, data={'text': 'Не сохранится'})
+        assert Comment.objects.count() == count, (
+            'Проверьте, что комментарий и количество комментариев отзыва сохраняются в одной транзакции'
+        )
+        assert comment_counts()[reviews[1]['id']] == 0
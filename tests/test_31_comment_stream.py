@@ -0,0 +1,211 @@
+import asyncio
+import json
+
+import pytest
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .common import create_comments
+
+STREAM_URL = '/api/v1/titles/{title}/reviews/{review}/comments/stream/'
+
+
+def make_application(heartbeat=15):
+    from api.streams import CommentStream
+    from api_yamdb.asgi import Application, WsgiToAsgi, wsgi_application
+    stream = CommentStream()
+    stream.heartbeat = heartbeat
+    return Application(stream, WsgiToAsgi(wsgi_application, threads=2))
+
+
+class Connection:
+    """Клиент ASGI: передаёт запрос приложению и собирает ответ."""
+
+    def __init__(self, application, method, path, query=b'', headers=(), body=b''):
+        self.scope = {
+            'type': 'http', 'method': method, 'path': path, 'query_string': query,
+            'headers': [(b'host', b'testserver'), *headers], 'server': ('testserver', 80),
+        }
+        self.inbox = asyncio.Queue()
+        self.inbox.put_nowait({'type': 'http.request', 'body': body})
+        self.messages = asyncio.Queue()
+        self.task = asyncio.ensure_future(application(self.scope, self.inbox.get, self.messages.put))
+        self.status = None
+        self.headers = {}
+        self.body = b''
+
+    async def read(self, timeout=5):
+        """Читает сообщения ответа, пока не придёт новая часть тела."""
+        while True:
+            message = await asyncio.wait_for(self.messages.get(), timeout)
+            if message['type'] == 'http.response.start':
+                self.status = message['status']
+                self.headers = dict(message['headers'])
+                continue
+            self.body += message.get('body', b'')
+            if message.get('body') or not message.get('more_body'):
+                return message
+
+    async def started(self, timeout=5):
+        """Ждёт начала ответа."""
+        message = await asyncio.wait_for(self.messages.get(), timeout)
+        assert message['type'] == 'http.response.start'
+        self.status = message['status']
+        self.headers = dict(message['headers'])
+
+    async def events(self, count, timeout=5):
+        """Читает поток, пока не наберётся count событий SSE."""
+        while self.body.count(b'\n\n') < count:
+            message = await self.read(timeout)
+            if not message.get('more_body'):
+                break
+        return parse_events(self.body)
+
+    async def close(self):
+        self.inbox.put_nowait({'type': 'http.disconnect'})
+        await asyncio.wait_for(self.task, 5)
+
+
+def parse_events(body):
+    events = []
+    for block in body.decode().split('\n\n'):
+        if not block:
+            continue
+        event = {}
+        for line in block.split('\n'):
+            name, _, value = line.partition(': ')
+            event[name] = value
+        events.append(event)
+    return events
+
+
+def comment_events(events):
+    return [json.loads(event['data']) for event in events if event.get('event') == 'comment']
+
+
+def post_comment(application, url, user, text):
+    token = str(RefreshToken.for_user(user).access_token)
+    body = json.dumps({'text': text}).encode()
+    return Connection(application, 'POST', url, headers=[
+        (b'authorization', f'Bearer {token}'.encode()),
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode()),
+    ], body=body)
+
+
+class Test31CommentStream:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_backlog_and_new_comments(self, admin_client, admin):
+        comments, reviews, titles, user, _ = create_comments(admin_client, admin)
+        path = STREAM_URL.format(title=titles[0]['id'], review=reviews[0]['id'])
+
+        async def scenario():
+            application = make_application()
+            watcher = Connection(application, 'GET', path, query=f'after={comments[0]["id"]}'.encode())
+            events = await watcher.events(2)
+            assert watcher.status == 200
+            assert watcher.headers[b'content-type'].startswith(b'text/event-stream')
+            assert [item['id'] for item in comment_events(events)] == [
+                comments[1]['id'], comments[2]['id']
+            ], 'Проверьте, что поток сначала отдаёт комментарии после курсора'
+            assert events[0]['id'] == str(comments[1]['id'])
+            post = post_comment(application, path.replace('stream/', ''), user, 'Новый')
+            await post.read()
+            assert post.status == 201
+            created = json.loads(post.body)
+            events = await watcher.events(3)
+            new = comment_events(events)[-1]
+            assert new['id'] == created['id'] and new['text'] == 'Новый', (
+                'Проверьте, что новый комментарий приходит в поток отзыва'
+            )
+            assert new['review'] == reviews[0]['id'] and new['author'] == user.username
+            await watcher.close()
+
+        asyncio.run(scenario())
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_idle_watchers_do_not_query(self, admin_client, admin, monkeypatch):
+        from django.db.backends import utils
+        _, reviews, titles, user, _ = create_comments(admin_client, admin)
+        path = STREAM_URL.format(title=titles[0]['id'], review=reviews[1]['id'])
+        queries = []
+        execute = utils.CursorWrapper.execute
+
+        def counting_execute(self, sql, params=None):
+            queries.append(sql)
+            return execute(self, sql, params)
+
+        monkeypatch.setattr(utils.CursorWrapper, 'execute', counting_execute)
+
+        async def scenario():
+            from api.streams import broker
+            application = make_application(heartbeat=0.05)
+            watchers = [Connection(application, 'GET', path) for _ in range(50)]
+            while broker.watchers(reviews[1]['id']) < 50 or len(queries) < 50:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            queries.clear()
+            await asyncio.sleep(0.3)
+            assert not queries, 'Проверьте, что ожидающие наблюдатели не выполняют запросов к БД'
+            await watchers[0].events(1)
+            assert watchers[0].body.startswith(b': ping'), (
+                'Проверьте, что ожидающему наблюдателю отправляется heartbeat'
+            )
+            for watcher in watchers:
+                await watcher.close()
+            assert broker.watchers(reviews[1]['id']) == 0, (
+                'Проверьте, что отключившийся наблюдатель снимается с подписки'
+            )
+
+        asyncio.run(scenario())
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_errors_and_last_event_id(self, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+
+        async def scenario():
+            application = make_application()
+            wrong = Connection(application, 'GET', STREAM_URL.format(title=titles[1]['id'], review=reviews[0]['id']))
+            await wrong.read()
+            assert wrong.status == 404
+            invalid = Connection(
+                application, 'GET', STREAM_URL.format(title=titles[0]['id'], review=reviews[0]['id']),
+                query=b'after=abc'
+            )
+            await invalid.read()
+            assert invalid.status == 400
+            watcher = Connection(
+                application, 'GET', STREAM_URL.format(title=titles[0]['id'], review=reviews[0]['id']),
+                headers=[(b'last-event-id', str(comments[1]['id']).encode())]
+            )
+            events = await watcher.events(1)
+            assert [item['id'] for item in comment_events(events)] == [comments[2]['id']], (
+                'Проверьте, что заголовок Last-Event-ID работает как курсор'
+            )
+            await watcher.close()
+
+        asyncio.run(scenario())
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_bulk_comments_reset(self, admin_client, admin):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        path = STREAM_URL.format(title=titles[0]['id'], review=reviews[0]['id'])
+
+        async def scenario():
+            application = make_application()
+            watcher = Connection(application, 'GET', path)
+            await watcher.started()
+            assert watcher.status == 200
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(None, lambda: admin_client.post(
+                '/api/v1/comments/bulk/', data=[{'review': reviews[0]['id'], 'text': 'Пакет'}],
+                format='json'
+            ))
+            assert response.status_code == 201
+            events = await watcher.events(1)
+            assert events[-1].get('event') == 'reset', (
+                'Проверьте, что после пакетного создания наблюдатели получают событие reset'
+            )
+            await asyncio.wait_for(watcher.task, 5)
+
+        asyncio.run(scenario())
@@ -0,0 +1,57 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_comments, explain_query_plan
+
+
+def list_plan(client, url, table):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    sql = next(
+        query['sql'] for query in queries.captured_queries
+        if f'FROM "{table}"' in query['sql'] and 'ORDER BY' in query['sql']
+    )
+    return explain_query_plan(sql)
+
+
+class Test32ListIndexes:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('params', ('', '?fields=id,text', '?cursor=', '?count=false'))
+    def test_01_reviews(self, client, admin_client, admin, params):
+        _, _, titles, _, _ = create_comments(admin_client, admin)
+        plan = list_plan(client, f'/api/v1/titles/{titles[0]["id"]}/reviews/{params}', 'reviews_review')
+        assert not any('TEMP B-TREE' in step for step in plan), (
+            f'Проверьте, что список отзывов читается по индексу без сортировки, план: {plan}'
+        )
+        assert any('review_title_pub_date_idx' in step for step in plan), plan
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('params', ('', '?fields=id,text', '?cursor=', '?count=false'))
+    def test_02_comments(self, client, admin_client, admin, params):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/{params}'
+        for headers in ({}, {'HTTP_ACCEPT': 'application/json; version=2'}):
+            with CaptureQueriesContext(connection) as queries:
+                assert client.get(url, **headers).status_code == 200
+            sql = next(
+                query['sql'] for query in queries.captured_queries
+                if 'FROM "reviews_comment"' in query['sql'] and 'ORDER BY' in query['sql']
+            )
+            plan = explain_query_plan(sql)
+            assert not any('TEMP B-TREE' in step for step in plan), (
+                f'Проверьте, что список комментариев читается по индексу без сортировки, план: {plan}'
+            )
+            assert any('comment_review_pub_date_idx' in step for step in plan), plan
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_cursor_page(self, client, admin_client, admin):
+        _, _, titles, _, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/?cursor=&limit=1'
+        next_url = client.get(url).json()['next']
+        plan = list_plan(client, next_url, 'reviews_review')
+        assert not any('TEMP B-TREE' in step for step in plan), (
+            f'Проверьте, что следующая страница курсора читается по индексу, план: {plan}'
+        )